@@ -1,6 +1,7 @@
 import numpy as np
 
 import config
+from observation import ObservationCodec
 
 
 class AbstractMemory(object):
@@ -15,13 +16,23 @@ class AbstractMemory(object):
     def get_batch(self, model, batch_size=50):
         raise NotImplementedError("Class %s doesn't implement get_batch(model, batch_size=50)" % self.__class__.__name__)
 
+    def get_state(self):
+        raise NotImplementedError("Class %s doesn't implement get_state()" % self.__class__.__name__)
+
+    def set_state(self, state):
+        raise NotImplementedError("Class %s doesn't implement set_state(state)" % self.__class__.__name__)
+
 
 class AbstractAgent(object):
     """A self-learning agent that is implemented by a certain
     keras model. This class represents an interface for an agent"""
-    def __init__(self):
+    def __init__(self, codec=None):
         self.num_actions = len(config.actions)
         self.q = np.zeros(self.num_actions)
+        # Converts the stored observations to the float32 input of the model
+        self.codec = codec if codec is not None else ObservationCodec()
+        # Rolling history of decoded observations, only used by agents that look back in time
+        self.history = None
 
     def _init_model(self):
         raise NotImplementedError("Class %s doesn't implement _init_model()" % self.__class__.__name__)
@@ -29,9 +40,38 @@ class AbstractAgent(object):
     def predict_action(self, input_data, epsilon=.1):
         raise NotImplementedError("Class %s doesn't implement predict_action(input_data, epsilon=.1)" % self.__class__.__name__)
 
-    def get_new_state(self, input_data, action, reward, input_datap1):
+    def get_new_state(self, input_data, action, reward, input_datap1, train=True):
         raise NotImplementedError("Class %s doesn't implement get_new_state(input_data, action, reward, "
-                                  "input_datap1):" % self.__class__.__name__)
+                                  "input_datap1, train=True):" % self.__class__.__name__)
+
+    def observe(self, input_data):
+        """Called with every new observation of the game, before the next
+        action is predicted"""
+        if self.history is not None:
+            self.history.push(self.codec.decode(input_data))
+
+    def clear_history(self):
+        if self.history is not None:
+            self.history.clear()
 
     def get_q_values(self):
         return self.q
+
+    def get_state(self):
+        """Returns a picklable snapshot of the model weights, the optimizer
+        state and the replay memory"""
+        return {
+            "weights": self.model.get_weights(),
+            "optimizer": self.model.optimizer.get_weights(),
+            "memory": self.memory.get_state(),
+        }
+
+    def set_state(self, state):
+        self.model.set_weights(state["weights"])
+        if state["optimizer"]:
+            # Keras only creates the optimizer weights together with the train function.
+            if not self.model.optimizer.weights and hasattr(self.model, "_make_train_function"):
+                self.model._make_train_function()
+            self.model.optimizer.set_weights(state["optimizer"])
+        self.memory.set_state(state["memory"])
+
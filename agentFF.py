@@ -3,17 +3,26 @@ from keras.models import Sequential
 from keras.layers.core import Dense
 from keras.optimizers import sgd
 from agent import AbstractAgent, AbstractMemory
+from history import ObservationHistory
+from observation import ObservationCodec
 
 
 class Memory(AbstractMemory):
-	def __init__(self, max_memory=100, discount=.99):
+	def __init__(self, max_memory=100, discount=.99, codec=None):
 		self.max_memory = max_memory
 		self.memory = list()
 		self.discount = discount
+		self.codec = codec
 
 	def clear(self):
 		self.memory = list()
 
+	def get_state(self):
+		return list(self.memory)
+
+	def set_state(self, state):
+		self.memory = list(state)
+
 	def remember(self, states):
 		# memory[i] = [[state_t, action_t, reward_t, state_t+1], game_over?]
 		self.memory.append([states])
@@ -22,48 +31,71 @@ class Memory(AbstractMemory):
 
 	def get_batch(self, model, batch_size=50):
 		len_memory = len(self.memory)
-		num_actions = model.output_shape[-1]
-		env_dim = self.memory[0][0][0].shape[1]
-		inputs = np.zeros((min(len_memory, batch_size), env_dim))
-		targets = np.zeros((inputs.shape[0], num_actions))
-		for i, idx in enumerate(np.random.randint(0, len_memory, size=inputs.shape[0])):
-			state_t, action_t, reward_t, state_tp1 = self.memory[idx][0]
+		batch = [self.memory[idx][0] for idx in np.random.randint(0, len_memory, size=min(len_memory, batch_size))]
+		# The stored states are decoded to float32 for the whole batch at once
+		inputs = self.codec.decode_batch([state_t for state_t, _, _, _ in batch])
+		inputs_tp1 = self.codec.decode_batch([state_tp1 for _, _, _, state_tp1 in batch])
+		actions = np.array([action_t for _, action_t, _, _ in batch])
+		rewards = np.array([reward_t for _, _, reward_t, _ in batch], dtype=np.float32)
 
-			inputs[i:i+1] = state_t
-			# There should be no target values for actions not taken.
-			# Thou shalt not correct actions not taken #deep
-			targets[i] = model.predict(state_t)[0]
-			Q_sa = np.max(model.predict(state_tp1)[0])
-			# reward_t + gamma * max_a' Q(s', a')
-			targets[i, action_t] = reward_t + self.discount * Q_sa
+		# There should be no target values for actions not taken.
+		# Thou shalt not correct actions not taken #deep
+		targets = model.predict(inputs)
+		Q_sa = np.max(model.predict(inputs_tp1), axis=1)
+		# reward_t + gamma * max_a' Q(s', a')
+		targets[np.arange(len(batch)), actions] = rewards + self.discount * Q_sa
 		return inputs, targets
 
 
 class Agent(AbstractAgent):
 
-	def __init__(self, input_size, hidden_size=150):
-		super().__init__()
+	def __init__(self, input_size, hidden_size=150, learning_rate=1e-03, discount=.99, max_memory=100, codec=None,
+				 stack=1, trainable=True):
+		super().__init__(codec)
 		self.input_size = input_size
 		self.hidden_size = hidden_size
+		self.learning_rate = learning_rate
+		self.discount = discount
+		self.max_memory = max_memory
+		self.stack = stack
+		self.last_stack = None
+		self.trainable = trainable
 		self._init_model()
 
 	def _init_model(self):
 		self.model = Sequential()
-		self.model.add(Dense(self.hidden_size, input_shape=(self.input_size, ), activation='sigmoid'))
+		self.model.add(Dense(self.hidden_size, input_shape=(self.input_size * self.stack, ), activation='sigmoid'))
 		self.model.add(Dense(self.num_actions, activation='linear'))
-		self.model.compile(optimizer=sgd(lr=1e-03), loss="mse")
-		self.memory = Memory()
+		if self.trainable:
+			# Models that are only evaluated don't need an optimizer and gradients
+			self.model.compile(optimizer=sgd(lr=self.learning_rate), loss="mse")
+		memory_codec = self.codec
+		if self.stack > 1:
+			# The model gets the last `stack` observations, the memory stores the stacked states like single ones
+			self.history = ObservationHistory(self.stack, self.input_size)
+			memory_codec = ObservationCodec(self.codec.dtype, self.input_size * self.stack, self.codec.grid)
+		self.memory = Memory(max_memory=self.max_memory, discount=self.discount, codec=memory_codec)
+
+	def observe(self, input_data):
+		if self.history is not None:
+			self.last_stack = self.memory.codec.encode_input(self.history.stacked())
+		super().observe(input_data)
 
 	def predict_action(self, input_data, epsilon=.1):
 		if np.random.rand() <= epsilon:
 			action = np.random.randint(0, self.num_actions, size=1)[0]
 		else:
-			self.q = self.model.predict(input_data, batch_size=self.input_size)[0]
+			input_data = self.history.stacked() if self.history is not None else self.codec.decode(input_data)
+			self.q = self.model.predict_on_batch(input_data)[0]
 			action = np.argmax(self.q)
 		return action
 
-	def get_new_state(self, input_data, action, reward, input_datap1):
+	def get_new_state(self, input_data, action, reward, input_datap1, train=True):
+		if self.history is not None:
+			input_data, input_datap1 = self.last_stack, self.memory.codec.encode_input(self.history.stacked())
 		self.memory.remember([input_data, action, reward, input_datap1])
+		if not train:
+			return 0
 		inputs, targets = self.memory.get_batch(self.model)
 		loss = self.model.train_on_batch(inputs, targets)
 		return loss
@@ -4,19 +4,27 @@ from keras.layers.core import Dense
 from keras.layers import LSTM
 from keras.optimizers import sgd
 from agent import AbstractAgent, AbstractMemory
+from history import ObservationHistory
 
 TIMESTEPS = 20
 
 
 class Memory(AbstractMemory):
-    def __init__(self, max_memory=TIMESTEPS*3, discount=.99):
+    def __init__(self, max_memory=TIMESTEPS*3, discount=.99, codec=None):
         self.max_memory = max_memory
         self.memory = list()
         self.discount = discount
+        self.codec = codec
 
     def clear(self):
         self.memory = list()
 
+    def get_state(self):
+        return list(self.memory)
+
+    def set_state(self, state):
+        self.memory = list(state)
+
     def remember(self, states):
         # memory[i] = [[state_t, action_t, reward_t, state_t+1], game_over?]
         self.memory.append([states])
@@ -24,22 +32,16 @@ class Memory(AbstractMemory):
             del self.memory[0]
 
     def get_time_seq(self, idx):
-        if idx == 0:
-            idx = len(self.memory) - TIMESTEPS
-        env_dim = self.memory[0][0][0].shape[1]
-        time_seq = np.zeros([TIMESTEPS, env_dim])
-        for j in range(TIMESTEPS):
-            state_t, action_t, reward_t, state_tp1 = self.memory[idx + j][0]
-            time_seq[j] = state_t
+        time_seq = self.codec.decode_batch([self.memory[idx + j][0][0] for j in range(TIMESTEPS)])
         time_seq = np.expand_dims(time_seq, 0)
         return time_seq
 
     def get_batch(self, model, batch_size=1):
         len_memory = len(self.memory)
         num_actions = model.output_shape[-1]
-        env_dim = self.memory[0][0][0].shape[1]
-        inputs = np.zeros((batch_size, TIMESTEPS, env_dim))
-        targets = np.zeros((inputs.shape[0], num_actions))
+        env_dim = self.codec.decode(self.memory[0][0][0]).shape[1]
+        inputs = np.zeros((batch_size, TIMESTEPS, env_dim), dtype=np.float32)
+        targets = np.zeros((inputs.shape[0], num_actions), dtype=np.float32)
         for i, idx in enumerate(np.random.randint(0, len_memory - TIMESTEPS, size=inputs.shape[0])):
             _, action_t, reward_t, statep1 = self.memory[idx + TIMESTEPS][0]
             time_seq = self.get_time_seq(idx)
@@ -47,7 +49,7 @@ class Memory(AbstractMemory):
             targets[i] = model.predict(time_seq)[0]
             # Delete the first state and add the next state
             time_seqp1 = np.delete(time_seq, 0, 1)
-            time_seqp1 = np.append(time_seqp1, [statep1], 1)
+            time_seqp1 = np.append(time_seqp1, [self.codec.decode(statep1)], 1)
             Q_sa = np.max(model.predict(time_seqp1)[0])
             # reward_t + gamma * max_a' Q(s', a')
             targets[i, action_t] = reward_t + self.discount * Q_sa
@@ -56,10 +58,15 @@ class Memory(AbstractMemory):
 
 class Agent(AbstractAgent):
 
-    def __init__(self, input_size, hidden_size=150):
-        super().__init__()
+    def __init__(self, input_size, hidden_size=150, learning_rate=1e-03, discount=.99, max_memory=TIMESTEPS*3,
+                 codec=None, trainable=True):
+        super().__init__(codec)
         self.input_size = input_size
         self.hidden_size = hidden_size
+        self.learning_rate = learning_rate
+        self.discount = discount
+        self.max_memory = max_memory
+        self.trainable = trainable
         self._init_model()
 
     def _init_model(self):
@@ -67,22 +74,26 @@ class Agent(AbstractAgent):
         self.model.add(LSTM(self.hidden_size, return_sequences=True, input_shape=(TIMESTEPS, self.input_size)))
         self.model.add(LSTM(self.hidden_size, return_sequences=False))
         self.model.add(Dense(self.num_actions, activation='linear'))
-        self.model.compile(optimizer=sgd(lr=1e-03), loss="mse")
-        self.memory = Memory()
+        if self.trainable:
+            # Models that are only evaluated don't need an optimizer and gradients
+            self.model.compile(optimizer=sgd(lr=self.learning_rate), loss="mse")
+        self.memory = Memory(max_memory=self.max_memory, discount=self.discount, codec=self.codec)
+        self.history = ObservationHistory(TIMESTEPS, self.input_size)
 
     def predict_action(self, input_data, epsilon=.1):
-        if np.random.rand() <= epsilon or len(self.memory.memory) < TIMESTEPS:
+        if np.random.rand() <= epsilon:
             action = np.random.randint(0, self.num_actions, size=1)[0]
         else:
-            input_data = self.memory.get_time_seq(0)
-            self.q = self.model.predict(input_data, batch_size=self.input_size)[0]
+            # The history is updated every frame, so the time sequence doesn't have to be rebuilt from the memory
+            input_data = self.history.window()[np.newaxis]
+            self.q = self.model.predict_on_batch(input_data)[0]
             action = np.argmax(self.q)
         return action
 
-    def get_new_state(self, input_data, action, reward, input_datap1):
+    def get_new_state(self, input_data, action, reward, input_datap1, train=True):
         self.memory.remember([input_data, action, reward, input_datap1])
         loss = 0
-        if len(self.memory.memory) > TIMESTEPS:
+        if train and len(self.memory.memory) > TIMESTEPS:
             inputs, targets = self.memory.get_batch(self.model)
             loss = self.model.train_on_batch(inputs, targets)
 
@@ -0,0 +1,72 @@
+import random
+import numpy as np
+from agent import AbstractAgent, AbstractMemory
+
+
+class Memory(AbstractMemory):
+    def __init__(self, max_memory=100, codec=None):
+        self.max_memory = max_memory
+        self.memory = list()
+        self.codec = codec
+
+    def clear(self):
+        self.memory = list()
+
+    def get_state(self):
+        return list(self.memory)
+
+    def set_state(self, state):
+        self.memory = list(state)
+
+    def remember(self, states):
+        self.memory.append([states])
+        if len(self.memory) > self.max_memory:
+            del self.memory[0]
+
+    def get_batch(self, model, batch_size=50):
+        len_memory = len(self.memory)
+        batch = [self.memory[idx][0] for idx in np.random.randint(0, len_memory, size=min(len_memory, batch_size))]
+        inputs = self.codec.decode_batch([state_t for state_t, _, _, _ in batch])
+        inputs_tp1 = self.codec.decode_batch([state_tp1 for _, _, _, state_tp1 in batch])
+        return inputs, inputs_tp1
+
+
+class Agent(AbstractAgent):
+    """An agent without a model that plays random actions. It keeps a
+    replay memory like the other agents, so it can be used to benchmark
+    the game without loading Keras"""
+
+    def __init__(self, input_size, max_memory=100, codec=None):
+        super().__init__(codec)
+        self.input_size = input_size
+        self.model = None
+        self.memory = Memory(max_memory=max_memory, codec=self.codec)
+
+    def get_state(self):
+        return {"weights": [], "optimizer": [], "memory": self.memory.get_state()}
+
+    def set_state(self, state):
+        self.memory.set_state(state["memory"])
+
+    def predict_action(self, input_data, epsilon=.1):
+        return np.random.randint(0, self.num_actions, size=1)[0]
+
+    def get_new_state(self, input_data, action, reward, input_datap1, train=True):
+        self.memory.remember([input_data, action, reward, input_datap1])
+        if train:
+            self.memory.get_batch(self.model)
+        return 0
+
+
+def random_game(cfg, seed):
+    """ A Game of the config with random agents, after seeding the random
+        number generators. Used by the benchmarks and validations that
+        replay the same game without Keras. """
+    from game import Game
+    from observation import ObservationCodec
+
+    random.seed(seed)
+    np.random.seed(seed)
+    size = Game.get_data_size(cfg)
+    codec = ObservationCodec(cfg.observation_dtype, size, cfg.use_grid)
+    return Game([Agent(size, codec=codec) for _ in range(cfg.total_players)], 0, cfg)
@@ -0,0 +1,187 @@
+import numpy as np
+import config
+from player import apply_actions
+from numpy_physics import move_bullets, bullet_player_overlaps, bullet_wall_overlaps
+
+
+def angle_scores(differences, angles, angle):
+    """ Line.angle_score for arrays of vectors from the origins to the
+        destinations and the angles of the origins. """
+    angle = angle / 180 * np.pi
+    direction = np.stack((np.cos(angles + angle), np.sin(angles + angle)), axis=-1)
+    norm = np.linalg.norm(differences, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = (differences * direction).sum(axis=-1) / norm
+    valid = (norm != 0) & (-1 < cosine) & (cosine < 1)
+    rotated = np.where(valid, np.arccos(np.where(valid, cosine, 0)), np.pi)
+    return np.round((np.pi - rotated) / np.pi, 2)
+
+
+def distances_from_line(origins, angles, destinations):
+    """ Line.distance_from_line for arrays of origins, their angles and the
+        destinations. """
+    a = np.tan(angles)
+    c = origins[..., 1] - a * origins[..., 0]
+    return np.abs(a * destinations[..., 0] - destinations[..., 1] + c) / np.sqrt(a * a + 1)
+
+
+def in_front(origins, angles, destinations):
+    """ Line.destination_in_front for arrays of origins, their angles and the
+        destinations. """
+    differences = destinations - origins
+    return differences[..., 0] * np.cos(angles) + differences[..., 1] * np.sin(angles) > 0
+
+
+class BatchedGame(object):
+    """ Plays many matches of the same configuration at once.
+
+        The state of all matches is stored in arrays with a leading match
+        dimension: players (matches, players) and bullets (matches, players,
+        slots). A step applies the actions of all players, moves all bullets
+        and computes the rewards and high level observations of all matches
+        with a few vectorized operations, following the rules of Game with
+        the numpy physics backend. There are no agents, the caller chooses
+        the actions. """
+
+    def __init__(self, matches, cfg, radius=50, speed=3, seed=None):
+        self.cfg = cfg
+        self.matches = matches
+        self.total_players = cfg.total_players
+        self.radius = np.full(self.total_players, float(radius))
+        self.speed = speed
+        self.random = np.random.RandomState(seed)
+        self.bounds = np.array((
+            (config.wall_offset + config.wall_width + radius, config.wall_offset + config.wall_width + radius),
+            (config.SCREEN_WIDTH - config.wall_offset - config.wall_width - radius,
+             config.SCREEN_HEIGHT - config.wall_offset - config.wall_width - radius),
+        ), dtype=float)
+
+        # A player shoots at most once every 10 frames, so a few slots per player hold all of its bullets
+        arena = np.hypot(config.SCREEN_WIDTH - 2 * config.wall_offset, config.SCREEN_HEIGHT - 2 * config.wall_offset)
+        lifetime = int(np.ceil(arena * cfg.fps / 1000.)) + 1
+        if cfg.bullet_lifetime > 0:
+            lifetime = min(lifetime, int(cfg.bullet_lifetime * cfg.fps) + 1)
+        self.slots = lifetime // 10 + 2
+
+        self.reset()
+
+    def reset(self):
+        """ Starts all matches with random positions and angles. """
+        shape = (self.matches, self.total_players)
+        self.frame = 0
+        self.positions = self.bounds[0] + self.random.randint(0, (self.bounds[1] - self.bounds[0]).astype(int) + 1,
+                                                              size=shape + (2,))
+        self.angles = self.random.randint(0, 361, size=shape).astype(float)
+        self.cooldowns = np.zeros(shape, dtype=int)
+        self.scores = np.zeros(shape, dtype=int)
+        self.shot_bullets = np.zeros(shape, dtype=int)
+        self.hit_bullets = np.zeros(shape, dtype=int)
+
+        shape += (self.slots,)
+        self.bullet_positions = np.zeros(shape + (2,))
+        self.bullet_velocities = np.zeros(shape + (2,))
+        self.bullet_angles = np.zeros(shape)
+        self.bullet_ages = np.zeros(shape, dtype=int)
+        self.bullet_alive = np.zeros(shape, dtype=bool)
+        self.next_slot = np.zeros(shape[:2], dtype=int)
+
+    def step(self, actions):
+        """ Plays one frame of all matches with the actions (matches, players).
+            Returns the rewards (matches, players) and the new observations. """
+        old_scores = self.scores.copy()
+        shoot = apply_actions(self.positions, self.angles, self.cooldowns, np.asarray(actions), self.speed,
+                              self.bounds)
+        self.create_bullets(shoot)
+
+        dt = 1. / self.cfg.fps / self.cfg.physics_substeps
+        for _ in range(self.cfg.physics_substeps):
+            self.step_bullets(dt)
+        self.cull_bullets()
+
+        self.frame += 1
+        return self.scores - old_scores, self.get_high_level()
+
+    def create_bullets(self, shoot):
+        match, player = np.nonzero(shoot)
+        slot = self.next_slot[match, player]
+        direction = np.stack((np.cos(self.angles[match, player]), np.sin(self.angles[match, player])), axis=-1)
+        self.bullet_positions[match, player, slot] = (self.positions[match, player] +
+                                                      self.radius[player, np.newaxis] * direction)
+        self.bullet_velocities[match, player, slot] = 1000 * direction
+        self.bullet_angles[match, player, slot] = self.angles[match, player]
+        self.bullet_ages[match, player, slot] = 0
+        self.bullet_alive[match, player, slot] = True
+        self.next_slot[match, player] = (slot + 1) % self.slots
+        self.shot_bullets += shoot
+
+    def step_bullets(self, dt):
+        move_bullets(self.bullet_positions, self.bullet_velocities, dt)
+        positions = self.bullet_positions.reshape((self.matches, -1, 2))
+        alive = self.bullet_alive.reshape((self.matches, -1))
+
+        # hits (matches, bullets, players): the shooter scores a point for every bullet, every hit player loses one
+        hits = bullet_player_overlaps(positions, self.positions, self.radius) & alive[..., np.newaxis]
+        hit = hits.any(axis=-1)
+        hit_bullets = hit.reshape(self.bullet_alive.shape).sum(axis=-1)
+        self.hit_bullets += hit_bullets
+        self.scores += hit_bullets - hits.sum(axis=1)
+
+        removed = hit | bullet_wall_overlaps(positions)
+        self.bullet_alive &= ~removed.reshape(self.bullet_alive.shape)
+
+    def cull_bullets(self):
+        """ Removes bullets that left the arena or exceeded their lifetime. """
+        self.bullet_ages += 1
+        x = self.bullet_positions[..., 0]
+        y = self.bullet_positions[..., 1]
+        outside = ~((config.wall_offset <= x) & (x <= config.SCREEN_WIDTH - config.wall_offset) &
+                    (config.wall_offset <= y) & (y <= config.SCREEN_HEIGHT - config.wall_offset))
+        max_age = self.cfg.bullet_lifetime * self.cfg.fps
+        if max_age > 0:
+            outside |= self.bullet_ages > max_age
+        self.bullet_alive &= ~outside
+
+    def get_high_level(self, dtype=np.float32):
+        """ The high level observation of Game.get_high_level for all
+            matches, shape (matches, players * DATA_PER_PLAYER). """
+        data = np.zeros((self.matches, self.total_players, config.DATA_PER_PLAYER), dtype=dtype)
+        for i in range(self.total_players):
+            self.set_player_features(data[:, i], i)
+            self.set_bullet_feature(data[:, i], i)
+        return data.reshape((self.matches, -1))
+
+    def set_player_features(self, data, i):
+        origins = self.positions[:, i]
+        angles = self.angles[:, i]
+        for j in range(self.total_players):
+            if j == i:
+                continue
+            # As in Game, the features of the last other player overwrite the previous ones
+            destinations = self.positions[:, j]
+            radius = self.radius[j]
+            distance = distances_from_line(origins, angles, destinations)
+            distance_score = np.where(distance < radius, np.round((radius - distance) / radius, 2), 0)
+            data[:, 0] = np.where(in_front(origins, angles, destinations), distance_score > 0, data[:, 0])
+
+            differences = destinations - origins
+            data[:, 1] = angle_scores(differences, angles, 10) > angle_scores(differences, angles, -10)
+            data[:, 2] = angle_scores(differences, angles, 0)
+
+    def set_bullet_feature(self, data, i):
+        positions = self.bullet_positions.reshape((self.matches, -1, 2))
+        angles = self.bullet_angles.reshape((self.matches, -1))
+        alive = self.bullet_alive.reshape((self.matches, -1))
+        player = self.positions[:, np.newaxis, i]
+        heading = (in_front(positions, angles, player) &
+                   (distances_from_line(positions, angles, player) <= self.radius[i]))
+        data[:, 3] = (heading & alive).any(axis=-1)
+
+    def best_players(self):
+        """ The index of the player with the highest positive score of every
+            match, or -1 when no player has a positive score. """
+        best = np.argmax(self.scores, axis=1)
+        return np.where(self.scores.max(axis=1) > 0, best, -1)
+
+    def get_accuracy(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.shot_bullets > 0, self.hit_bullets / self.shot_bullets * 100, 0)
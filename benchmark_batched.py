@@ -0,0 +1,50 @@
+import sys
+import time
+import argparse
+import numpy as np
+from agentRandom import random_game
+import config
+from config import Config
+from batched_game import BatchedGame
+
+
+def measure_game(cfg, frames, seed):
+    """ Frames per second of a single Game with random agents. """
+    game = random_game(cfg, seed)
+    start = time.time()
+    for _ in range(frames):
+        game.update_models()
+        game.update_physics(cfg.fps)
+    return frames / (time.time() - start)
+
+
+def measure_batched(cfg, matches, frames, seed):
+    """ Match frames per second of a BatchedGame with random actions. """
+    batched = BatchedGame(matches, cfg, seed=seed)
+    actions = np.random.RandomState(seed).randint(0, len(config.actions), size=(frames, matches, cfg.total_players))
+    start = time.time()
+    for frame in range(frames):
+        batched.step(actions[frame])
+    return matches * frames / (time.time() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of the batched game compared to single games")
+    parser.add_argument("--frames", type=int, default=500, help="frames played per measurement")
+    parser.add_argument("--matches", type=int, nargs="+", default=[1, 100, 1000, 4000],
+                        help="numbers of matches of the batched game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random number generators")
+    args = parser.parse_args(argv)
+
+    base = Config(display_frame=False)
+    print("%-22s  %14s" % ("simulator", "match frames/s"))
+    for physics in ["pymunk", "numpy"]:
+        print("%-22s  %14.0f" % ("Game (" + physics + ")", measure_game(base.replace(physics=physics), args.frames,
+                                                                       args.seed)))
+    for matches in args.matches:
+        print("%-22s  %14.0f" % ("BatchedGame (%d)" % matches, measure_batched(base, matches, args.frames,
+                                                                               args.seed)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import sys
+import time
+import argparse
+from agentRandom import random_game
+from config import Config
+
+DTYPES = {
+    "high_level": ["float64", "float32"],
+    "grid": ["float64", "float32", "uint8", "packed"],
+}
+
+
+def measure(observation, dtype, frames, batches, seed):
+    cfg = Config(display_frame=False, use_grid=observation == "grid", observation_dtype=dtype)
+    game = random_game(cfg, seed)
+
+    start = time.time()
+    for _ in range(frames):
+        game.run(False)
+    frames_per_sec = frames / (time.time() - start)
+
+    memory = game.agents[0].memory
+    start = time.time()
+    for _ in range(batches):
+        memory.get_batch(None)
+    batch_time = (time.time() - start) / batches
+
+    memory_bytes = sum(state_t.nbytes + state_tp1.nbytes for [(state_t, _, _, state_tp1)] in memory.memory)
+    return game.current_state.nbytes, memory_bytes, frames_per_sec, batch_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory and throughput of the observation dtypes")
+    parser.add_argument("--frames", type=int, default=500, help="frames played per measurement")
+    parser.add_argument("--batches", type=int, default=200, help="replay batches assembled per measurement")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random number generators")
+    args = parser.parse_args(argv)
+
+    print("%-11s  %-7s  %10s  %12s  %10s  %12s" % (
+        "observation", "dtype", "bytes/obs", "replay bytes", "frames/s", "batch (ms)"))
+    for observation, dtypes in DTYPES.items():
+        for dtype in dtypes:
+            obs_bytes, memory_bytes, frames_per_sec, batch_time = measure(
+                observation, dtype, args.frames, args.batches, args.seed)
+            print("%-11s  %-7s  %10d  %12d  %10.1f  %12.3f" % (
+                observation, dtype, obs_bytes, memory_bytes, frames_per_sec, batch_time * 1000))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import sys
+import time
+import argparse
+import subprocess
+
+# Runs in a fresh interpreter, so every measurement includes all imports.
+FIRST_FRAME_SCRIPT = """
+import sys
+import time
+start = time.time()
+from config import Config
+from world import World
+from game import Game
+imported = time.time()
+cfg = Config(display_frame=False, checkpoint_every=0, metrics_file={metrics_file!r})
+world = World(cfg)
+game = Game(world.agents, 0, cfg)
+game.run(world.screen)
+first_frame = time.time()
+world.quit()
+heavy = [name for name in ("pygame", "pandas", "openpyxl", "keras", "tensorflow", "theano") if name in sys.modules]
+print({marker!r}, imported - start, first_frame - start, ",".join(heavy))
+"""
+
+# pymunk prints a banner to stdout when it is imported, the result is the line starting with the marker
+RESULT_MARKER = "startup:"
+
+
+def measure(metrics_file):
+    script = FIRST_FRAME_SCRIPT.format(metrics_file=metrics_file, marker=RESULT_MARKER)
+    start = time.time()
+    lines = subprocess.check_output([sys.executable, "-c", script]).decode().splitlines()
+    total = time.time() - start
+    output = [line for line in lines if line.startswith(RESULT_MARKER)][-1].split()[1:]
+    heavy = output[2] if len(output) > 2 else ""
+    return float(output[0]), float(output[1]), total, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the time from startup to the first frame")
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh interpreters to measure")
+    parser.add_argument("--metrics-file", default="benchmark_startup.csv", help="metrics file used by the runs")
+    args = parser.parse_args(argv)
+
+    results = [measure(args.metrics_file) for _ in range(args.repeat)]
+    imports = sorted(r[0] for r in results)
+    first_frames = sorted(r[1] for r in results)
+    totals = sorted(r[2] for r in results)
+
+    print("Imports:          min %.3fs, median %.3fs" % (imports[0], imports[len(imports) // 2]))
+    print("First frame:      min %.3fs, median %.3fs" % (first_frames[0], first_frames[len(first_frames) // 2]))
+    print("Process total:    min %.3fs, median %.3fs" % (totals[0], totals[len(totals) // 2]))
+    print("Modules imported: " + (results[-1][3] or "-"))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
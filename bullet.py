@@ -8,7 +8,8 @@ class Bullet(pymunk.Body):
     def __init__(self, space, player, *args, **kwargs):
         super(Bullet, self).__init__(*args, **kwargs)
         self.mass = 1
-        self.radius = 10
+        self.radius = config.BULLET_RADIUS
+        self.age = 0
         self.power = 1000
         self.moment = pymunk.moment_for_circle(self.mass, 0, self.radius)
         self.shape = pymunk.Circle(self, self.radius)
@@ -0,0 +1,71 @@
+import os
+import glob
+import pickle
+import threading
+
+
+class Checkpointer(object):
+    """ Writes training checkpoints to disk. The state is captured on the
+        calling thread and written on a background thread, so training can
+        continue while the file is being written. Files are first written
+        to a temporary file and then renamed, so a crash never leaves a
+        half written checkpoint behind. """
+
+    prefix = "checkpoint_epoch_"
+    extension = ".pkl"
+
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep
+        self.thread = None
+        self.error = None
+
+    def path(self, epoch):
+        return os.path.join(self.directory, self.prefix + "%05d" % epoch + self.extension)
+
+    def save(self, state, epoch):
+        # Only one write is in flight at a time, so checkpoints are written in order.
+        self.wait()
+        self.thread = threading.Thread(target=self._write, args=(state, self.path(epoch)))
+        self.thread.start()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _write(self, state, path):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._remove_old()
+        except Exception as e:
+            self.error = e
+
+    def _remove_old(self):
+        if self.keep <= 0:
+            return
+
+        for path in self.list()[:-self.keep]:
+            os.remove(path)
+
+    def list(self):
+        return sorted(glob.glob(os.path.join(self.directory, self.prefix + "*" + self.extension)))
+
+    def latest(self):
+        checkpoints = self.list()
+        return checkpoints[-1] if checkpoints else None
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
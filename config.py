@@ -1,37 +1,147 @@
+import os
+import copy
+import json
 import numpy as np
 
 """ GAME OPTIONS """
-total_players = 2
-epochs = 5
-fps = 25
-game_length = fps * 20
-display_frame = True
-use_grid = False
-players = [
-    {
-        "feedforward": True,
-        "random": False,
-        "hidden_size": 50,
-    },
-    {
-        "feedforward": True,
-        "random": False,
-        "hidden_size": 50,
-    }
-]
+DEFAULTS = {
+    "total_players": 2,
+    "epochs": 5,
+    "fps": 25,
+    "game_seconds": 20,
+    "display_frame": True,
+    "debug": True,
+    "use_grid": False,
+    "observation_dtype": "float32",
+    "incremental_observation": True,
+    "verify_observations": False,
+    "physics": "pymunk",
+    "physics_substeps": 1,
+    "bullet_lifetime": 2,
+    "spatial_hash": False,
+    "spatial_hash_count": 1000,
+    "train_every": 1,
+    "seed": None,
+    "envs": 1,
+    "workers": 1,
+    "players": [
+        {
+            "feedforward": True,
+            "random": False,
+            "hidden_size": 50,
+        },
+        {
+            "feedforward": True,
+            "random": False,
+            "hidden_size": 50,
+        }
+    ],
+    "model_prefix": "model_player_",
+    "checkpoint_every": 1,
+    "checkpoint_dir": "checkpoints",
+    "checkpoint_keep": 3,
+    "metrics_file": "game_results.csv",
+    "metrics_every_frames": 0,
+    "memory_file": "",
+    "league_every": 0,
+    "league_size": 8,
+    "league_matches": 2,
+    "league_workers": 1,
+    "league_file": "league.json",
+}
 """ END GAME OPTIONS"""
 
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
 SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 800
 wall_offset = 100
 wall_width = 20
 GAME_WIDTH = SCREEN_WIDTH - (wall_offset + wall_width) * 2
 GAME_HEIGHT = SCREEN_HEIGHT - (wall_offset + wall_width) * 2
 EXTRA_LAYERS = 1
+BULLET_RADIUS = 10
 DATA_PER_PLAYER = 4
+colors = {
+    "red": (255, 0, 0, 255),
+    "green": (0, 255, 0, 255),
+    "blue": (0, 0, 255, 255),
+    "purple": (160, 32, 240, 255),
+    "yellow": (255, 255, 0, 255),
+}
 collision_types = {'player': 1, 'bullet': 2, 'wall': 3}
 actions = {'forward': 0, 'backward': 1, 'rotate_left': 2, 'rotate_right': 3, 'shoot': 4}
-debug = True
 
 
 def normalize_coordinate(value):
     return int(np.floor(value / 40))
+
+
+class Config(object):
+    """ The options of a single run. Every option of DEFAULTS is available
+        as an attribute, a config is passed explicitly to the world, the
+        game and the players so several configurations can be used in the
+        same process. """
+
+    def __init__(self, **options):
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise ValueError("Unknown config options: " + ", ".join(sorted(unknown)))
+
+        values = copy.deepcopy(DEFAULTS)
+        values.update(copy.deepcopy(options))
+        self.__dict__.update(values)
+
+    @property
+    def game_length(self):
+        return self.fps * self.game_seconds
+
+    def to_dict(self):
+        return {key: copy.deepcopy(getattr(self, key)) for key in DEFAULTS}
+
+    def replace(self, **options):
+        values = self.to_dict()
+        values.update(options)
+        return Config(**values)
+
+    def for_env(self, index):
+        """ Returns the config of environment `index` of a run with several
+            environments, with its own seed and output files. """
+        if self.envs <= 1:
+            return self
+
+        name, extension = os.path.splitext(self.metrics_file)
+        league_name, league_extension = os.path.splitext(self.league_file)
+        memory_name, memory_extension = os.path.splitext(self.memory_file)
+        return self.replace(
+            envs=1,
+            seed=None if self.seed is None else self.seed + index,
+            model_prefix=self.model_prefix.rstrip("_") + "_env" + str(index) + "_",
+            checkpoint_dir=os.path.join(self.checkpoint_dir, "env" + str(index)),
+            metrics_file=name + "_env" + str(index) + extension,
+            league_file=league_name + "_env" + str(index) + league_extension,
+            memory_file=memory_name + "_env" + str(index) + memory_extension if self.memory_file else "",
+        )
+
+    @staticmethod
+    def load(profile, **overrides):
+        """ Loads a profile from a JSON or YAML file. A name without a path
+            is looked up in the profiles directory. """
+        path = profile
+        if not os.path.isfile(path):
+            for extension in (".json", ".yaml", ".yml"):
+                candidate = os.path.join(PROFILE_DIR, profile + extension)
+                if os.path.isfile(candidate):
+                    path = candidate
+                    break
+            else:
+                raise ValueError("Profile not found: " + profile)
+
+        with open(path) as f:
+            if path.endswith(".yaml") or path.endswith(".yml"):
+                import yaml
+                options = yaml.safe_load(f) or {}
+            else:
+                options = json.load(f)
+
+        options.update(overrides)
+        return Config(**options)
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import random
+import argparse
+import numpy as np
+from config import Config
+from processes import run_in_pool
+
+
+def load_agents(cfg):
+    """ Agents of the players with the saved weights, built without an
+        optimizer. Random players get an agent without a model. """
+    import agentRandom
+    from game import Game
+    from observation import ObservationCodec
+    from world import create_agent
+
+    input_size = Game.get_data_size(cfg)
+    codec = ObservationCodec(cfg.observation_dtype, input_size, cfg.use_grid)
+    agents = []
+    for index, player in enumerate(cfg.players[:cfg.total_players]):
+        if player["random"]:
+            agents.append(agentRandom.Agent(input_size, codec=codec))
+            continue
+
+        agent = create_agent(player, input_size, codec, trainable=False)
+        name = cfg.model_prefix + str(index) + ".h5"
+        if os.path.isfile(name):
+            agent.model.load_weights(name)
+        else:
+            print("No weights found for player " + str(index) + ", it plays with an untrained model")
+        agents.append(agent)
+    return agents
+
+
+def run_episodes(arguments):
+    """ Plays greedy episodes without training, one per seed. """
+    from game import Game
+
+    options, seeds = arguments
+    cfg = Config(**options)
+    agents = load_agents(cfg)
+    results = []
+    for seed in seeds:
+        random.seed(seed)
+        np.random.seed(seed)
+        game = Game(agents, 0, cfg, training=False, epsilon=0)
+        for _ in range(cfg.game_length):
+            game.run(False)
+        results.append({
+            "seed": seed,
+            "winner": game.best_player(),
+            "scores": [player.score for player in game.players],
+            "accuracy": [player.get_accuracy() for player in game.players],
+        })
+    return results
+
+
+def summarize(results, total_players):
+    episodes = len(results)
+    summary = []
+    for index in range(total_players):
+        wins = sum(result["winner"] == index for result in results)
+        summary.append({
+            "player": index,
+            "wins": wins,
+            "win_rate": wins / episodes,
+            "accuracy": float(np.mean([result["accuracy"][index] for result in results])),
+            "score": float(np.mean([result["scores"][index] for result in results])),
+        })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Greedy evaluation of the saved models without training")
+    parser.add_argument("--profile", help="profile the models were trained with")
+    parser.add_argument("--episodes", type=int, default=100, help="number of seeded episodes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("--physics", choices=["pymunk", "numpy"], help="physics backend")
+    parser.add_argument("--output", help="JSON file the results of every episode are written to")
+    args = parser.parse_args(argv)
+
+    cfg = Config.load(args.profile) if args.profile else Config()
+    cfg = cfg.replace(display_frame=False, **({"physics": args.physics} if args.physics else {}))
+    seeds = list(range(args.seed, args.seed + args.episodes))
+    workers = max(1, min(args.workers, args.episodes))
+    jobs = [(cfg.to_dict(), seeds[worker::workers]) for worker in range(workers)]
+
+    if workers == 1:
+        results = run_episodes(jobs[0])
+    else:
+        results = [result for chunk in run_in_pool(run_episodes, jobs, workers) for result in chunk]
+    results.sort(key=lambda result: result["seed"])
+
+    summary = summarize(results, cfg.total_players)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "episodes": results}, f, indent=4)
+
+    print("Player  Wins  Win rate  Accuracy  Score")
+    for record in summary:
+        print("%6d  %4d  %8.2f  %8.2f  %5.2f" % (
+            record["player"], record["wins"], record["win_rate"], record["accuracy"], record["score"]))
+    draws = sum(result["winner"] is None for result in results)
+    print(str(draws) + " of " + str(len(results)) + " episodes had no winner")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import os
+import sys
+import argparse
+import config
+from metrics import read_metrics
+
+
+def export(metrics_path, excel_path):
+    """ Converts the last records of a metrics file to an excel sheet with
+        the total wins and the accuracy of every player per epoch. """
+    from pandas import DataFrame
+
+    # The last record of every epoch holds the end of epoch values.
+    rows = {}
+    for r in read_metrics(metrics_path):
+        key = (r["epoch"], r["player"])
+        if key not in rows or r["frame"] >= rows[key]["frame"]:
+            rows[key] = r
+    epochs = sorted(set(epoch for epoch, _ in rows))
+    players = sorted(set(player for _, player in rows))
+
+    data = {}
+    for key in ("wins", "accuracy"):
+        for player in players:
+            data[key + "_" + str(player)] = [rows[(epoch, player)][key] if (epoch, player) in rows else None
+                                             for epoch in epochs]
+
+    df = DataFrame(data=data, index=epochs)
+    df.to_excel(excel_path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a metrics file to an excel sheet")
+    parser.add_argument("metrics", nargs="?", default=config.DEFAULTS["metrics_file"], help="metrics file (.csv or .jsonl)")
+    parser.add_argument("--output", help="excel file to write, defaults to the next free game_results<i>.xlsx")
+    args = parser.parse_args(argv)
+
+    excel_path = args.output
+    if excel_path is None:
+        i = 1
+        while os.path.isfile('game_results' + str(i) + '.xlsx'):
+            i += 1
+        excel_path = 'game_results' + str(i) + '.xlsx'
+
+    export(args.metrics, excel_path)
+    print("Results written to " + excel_path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,10 @@
+import time
 import numpy as np
-import pygame
-from pygame.color import THECOLORS
-from pygame.locals import *
-import pymunk
-import pymunk.pygame_util
 import config
 from line import Line
-from player import Player
+from physics import create_physics
+from player import apply_actions
+from observation import ObservationCodec, IncrementalObservation
 
 
 class Game(object):
@@ -14,16 +12,21 @@ class Game(object):
         reset the game we'd just need to create a new instance of this
         class. """
 
-    def __init__(self, agents, epoch):
+    def __init__(self, agents, epoch, cfg, training=True, epsilon=.1):
         """ Constructor. Create all our attributes and initialize
-        the game. """
+        the game. Without training no transitions are stored and the
+        models are not trained. Players that aren't random explore with
+        probability `epsilon`. """
 
         self.agents = agents
+        self.cfg = cfg
+        self.training = training
+        self.epsilon = epsilon
         self.total_players = len(agents)
 
         self.epoch = epoch
-
-        self.space = pymunk.Space()
+        self.frame = 0
+        self.codec = ObservationCodec(cfg.observation_dtype, self.get_data_size(cfg), cfg.use_grid)
 
         # Create bullet lists
         self.bullets = []
@@ -31,120 +34,116 @@ class Game(object):
         # Create the players
         self.players = []
 
+        # Create the physics backend with the walls
+        self.physics = create_physics(self)
+
         colors = ["red", "green", "blue", "purple", "yellow"]
         for i in range(self.total_players):
-            player = Player(self.space, i, 50, colors[i])
+            player = self.physics.create_player(i, 50, config.colors[colors[i % len(colors)]], cfg.players[i]["random"])
             self.players.append(player)
 
+        # The vectorized action application has a fixed cost, it only pays off with enough players
+        vectorize_players = self.physics.vectorize_players
+        self.vectorized = vectorize_players is not None and self.total_players >= vectorize_players
+        # Per player constants of the vectorized action application
+        self.speeds = np.array([player.speed for player in self.players], dtype=float)
+        self.bounds = np.array([
+            [(player.offset["xmin"], player.offset["ymin"]) for player in self.players],
+            [(player.offset["xmax"], player.offset["ymax"]) for player in self.players],
+        ], dtype=float)
+
         # Initialize agents
         self.init_agents()
 
-        # Create walls
-        self.create_walls()
-
-        # Create bullet collision handler
-        self.init_collision_handlers()
+        # Statistics for the metrics writer
+        self.rewards = np.zeros(self.total_players)
+        self.losses = np.zeros(self.total_players)
+        self.train_steps = 0
+        self.train_time = 0.
 
+        self.observation = IncrementalObservation(self) if cfg.incremental_observation else None
         self.before_state = False
         self.current_state = self.get_data()
+        self.observe_state()
 
     def init_agents(self):
         for agent in self.agents:
             agent.memory.clear()
+            agent.clear_history()
 
-    def create_walls(self):
-        # walls - the left-top-right walls
-        top_left = (config.wall_offset, config.wall_offset)
-        top_right = (config.SCREEN_WIDTH - config.wall_offset, config.wall_offset)
-        bottom_left = (config.wall_offset, config.SCREEN_HEIGHT - config.wall_offset)
-        bottom_right = (config.SCREEN_WIDTH - config.wall_offset, config.SCREEN_HEIGHT - config.wall_offset)
-        static = [
-            pymunk.Segment(self.space.static_body, top_left, top_right, config.wall_width),
-            pymunk.Segment(self.space.static_body, top_right, bottom_right, config.wall_width),
-            pymunk.Segment(self.space.static_body, bottom_right, bottom_left, config.wall_width),
-            pymunk.Segment(self.space.static_body, top_left, bottom_left, config.wall_width),
-        ]
-
-        for s in static:
-            s.friction = 1.
-            s.group = 1
-            s.collision_type = config.collision_types["wall"]
-
-        self.space.add(static)
-
-    def init_collision_handlers(self):
-        def remove_bullet(arbiter, space, data):
-            bullet_shape = arbiter.shapes[0]
-            space.remove(bullet_shape, bullet_shape.body)
-            for bullet in self.bullets:
-                if bullet.shape == bullet_shape:
-                    self.bullets.remove(bullet)
-            return True
-
-        h = self.space.add_collision_handler(config.collision_types["bullet"], config.collision_types["wall"])
-        h.pre_solve = remove_bullet
-
-        def process_bullet_hit(arbiter, space, data):
-            bullet_shape = arbiter.shapes[0]
-            player_shape = arbiter.shapes[1]
-
-            for bullet in self.bullets:
-                if bullet.shape == bullet_shape:
-                    bullet.player.hit()
-
-            for player in self.players:
-                if player.shape == player_shape:
-                    player.hurt()
-
-            return remove_bullet(arbiter, space, data)
-
-        g = self.space.add_collision_handler(config.collision_types["bullet"], config.collision_types["player"])
-        g.pre_solve = process_bullet_hit
-
-        def process_players_hit(arbiter, space, data):
-            player1_shape = arbiter.shapes[0]
-            player2_shape = arbiter.shapes[1]
-
-            for player in self.players:
-                if player.shape == player1_shape or player.shape == player2_shape:
-                    player.touch_player()
-
-            return True
-
-        k = self.space.add_collision_handler(config.collision_types["player"], config.collision_types["player"])
-        k.pre_solve = process_players_hit
+    def observe_state(self):
+        for agent in self.agents:
+            agent.observe(self.current_state)
 
     def run(self, screen):
         # Update player models
         self.update_models()
 
         # Draw the current frame
-        if config.display_frame:
+        if self.cfg.display_frame:
             self.display_frame(screen)
 
         # Update frame and physics
-        self.update_physics(config.fps)
+        self.update_physics(self.cfg.fps)
 
         # Train models on updated data
-        self.train_models()
+        if self.training:
+            self.train_models()
+        self.frame += 1
 
     def update_models(self):
+        if self.vectorized:
+            self.update_models_vectorized()
+            return
+
         for player in self.players:
-            epsilon = 1 if player.random else .1
+            epsilon = 1 if player.random else self.epsilon
             action = self.agents[player.index].predict_action(self.current_state, epsilon)
             maybe_bullet = player.act(action)
             if maybe_bullet is not False:
                 self.bullets.append(maybe_bullet)
 
+    def update_models_vectorized(self):
+        """ Predicts the actions of all players and applies them in one
+            vectorized pass, like Player.act does for a single player. The
+            backend updates its position and angle arrays in place. """
+        actions = np.array([self.agents[player.index].predict_action(self.current_state,
+                                                                     1 if player.random else self.epsilon)
+                            for player in self.players])
+        positions, angles = self.physics.player_arrays()
+        cooldowns = np.array([player.shoot_cooldown for player in self.players])
+        shoot = apply_actions(positions, angles, cooldowns, actions, self.speeds, self.bounds)
+
+        # Like Player.act, every movement or rotation marks the player as moved, even against a wall
+        moved = actions != config.actions['shoot']
+        for player, action, cooldown, has_moved, shoots in zip(
+                self.players, actions.tolist(), cooldowns.tolist(), moved.tolist(), shoot.tolist()):
+            maybe_bullet = player.finish_action(action, cooldown, has_moved, shoots)
+            if maybe_bullet is not False:
+                self.bullets.append(maybe_bullet)
+
     def train_models(self):
+        # Transitions are stored every frame, the models are trained every train_every frames
+        train = self.frame % self.cfg.train_every == 0
+        start = time.time()
         for player in self.players:
             reward = player.get_reward()
-            self.agents[player.index].get_new_state(self.before_state, player.last_action, reward, self.current_state)
+            loss = self.agents[player.index].get_new_state(self.before_state, player.last_action, reward,
+                                                           self.current_state, train)
+            self.rewards[player.index] += reward
+            self.losses[player.index] += loss
+        if train:
+            self.train_steps += 1
+            self.train_time += time.time() - start
 
     def process_events(self):
         """ Process all of the events. Return a "False" if we need
             to close the window. """
+        if not self.cfg.display_frame:
+            return True
 
+        import pygame
+        from pygame.locals import QUIT, KEYDOWN, K_ESCAPE, K_q
         for event in pygame.event.get():
             if event.type == QUIT or \
                     event.type == KEYDOWN and (event.key in [K_ESCAPE, K_q]):
@@ -152,71 +151,108 @@ class Game(object):
         return True
 
     def get_data(self):
-        if config.use_grid:
+        if self.observation is None:
+            return self.codec.encode(self.get_full_data())
+
+        data = self.observation.update()
+        if self.cfg.verify_observations and not np.array_equal(data, self.get_full_data()):
+            raise AssertionError("Incremental observation differs from the full observation in frame " + str(self.frame))
+        return self.codec.encode(data)
+
+    def get_full_data(self):
+        if self.cfg.use_grid:
             return self.get_grid()
         else:
             return self.get_high_level()
 
     @staticmethod
-    def get_data_size():
-        if config.use_grid:
+    def get_data_size(cfg):
+        if cfg.use_grid:
             width = config.normalize_coordinate(config.GAME_WIDTH)
             height = config.normalize_coordinate(config.GAME_HEIGHT)
-            return (config.EXTRA_LAYERS + config.total_players) * width * height
+            return (config.EXTRA_LAYERS + cfg.total_players) * width * height
         else:
-            return config.DATA_PER_PLAYER * config.total_players
+            return config.DATA_PER_PLAYER * cfg.total_players
 
     def get_grid(self):
         width = config.normalize_coordinate(config.GAME_WIDTH)
         height = config.normalize_coordinate(config.GAME_HEIGHT)
-        offset = config.wall_width + config.wall_offset
-        data = np.zeros((config.EXTRA_LAYERS+self.total_players, width, height))
+        data = np.zeros((config.EXTRA_LAYERS+self.total_players, width, height), dtype=self.codec.build_dtype)
+        one = self.codec.value(1)
+        half = self.codec.value(0.5)
         for player in self.players:
             index = int(player.index)
-            x = config.normalize_coordinate(player.position.x - offset - player.radius)
-            y = config.normalize_coordinate(player.position.y - offset - player.radius)
-            data[index, x, y] = 1
-            shootX = min(width-1, max(0, x + int(round(np.cos(player.angle)))))
-            shootY = min(height-1, max(0, y + int(round(np.sin(player.angle)))))
-            data[index, shootX, shootY] = 0.5
+            x, y, shootX, shootY = self.player_cells(player)
+            data[index, x, y] = one
+            data[index, shootX, shootY] = half
             for bullet in self.bullets:
-                x = config.normalize_coordinate(bullet.position.x - offset)
-                y = config.normalize_coordinate(bullet.position.y - offset)
-                data[self.total_players, x, y] = 1
+                x, y = self.bullet_cell(bullet)
+                data[self.total_players, x, y] = one
         return data.reshape((1, -1))
 
+    @staticmethod
+    def player_cells(player):
+        """ Returns the grid cell of the player and the cell it is aiming at. """
+        width = config.normalize_coordinate(config.GAME_WIDTH)
+        height = config.normalize_coordinate(config.GAME_HEIGHT)
+        offset = config.wall_width + config.wall_offset
+        x = config.normalize_coordinate(player.position.x - offset - player.radius)
+        y = config.normalize_coordinate(player.position.y - offset - player.radius)
+        shootX = min(width-1, max(0, x + int(round(np.cos(player.angle)))))
+        shootY = min(height-1, max(0, y + int(round(np.sin(player.angle)))))
+        return x, y, shootX, shootY
+
+    @staticmethod
+    def bullet_cell(bullet):
+        offset = config.wall_width + config.wall_offset
+        x = config.normalize_coordinate(bullet.position.x - offset)
+        y = config.normalize_coordinate(bullet.position.y - offset)
+        return x, y
+
     def get_high_level(self):
-        data = np.zeros(self.total_players * config.DATA_PER_PLAYER)
+        data = np.zeros(self.total_players * config.DATA_PER_PLAYER, dtype=self.codec.build_dtype)
         i = 0
         for player in self.players:
-            for other in self.players:
-                if player.index is not other.index:
-                    line = Line(player, other)
-                    if line.destination_in_front():
-                        data[i] = line.distance_score(other.radius) > 0
-                    left_score = line.angle_score(10)
-                    right_score = line.angle_score(-10)
-                    go_left = left_score > right_score
-                    data[i + 1] = go_left
-                    data[i + 2] = line.angle_score(0)
-            for bullet in self.bullets:
-                line = Line(bullet, player)
-                if line.destination_in_front() and line.distance_from_line() <= player.radius:
-                    data[i + 3] = 1
+            self.set_player_features(data, i, player)
+            self.set_bullet_feature(data, i, player)
             i += config.DATA_PER_PLAYER
         return data.reshape((1, -1))
 
+    def set_player_features(self, data, i, player):
+        """ Sets the features of the player that depend on the other players. """
+        data[i:i + 3] = 0
+        for other in self.players:
+            if player.index is not other.index:
+                line = Line(player, other)
+                if line.destination_in_front():
+                    data[i] = line.distance_score(other.radius) > 0
+                left_score = line.angle_score(10)
+                right_score = line.angle_score(-10)
+                go_left = left_score > right_score
+                data[i + 1] = go_left
+                data[i + 2] = line.angle_score(0)
+
+    def set_bullet_feature(self, data, i, player):
+        """ Sets whether a bullet is heading towards the player. """
+        data[i + 3] = 0
+        for bullet in self.bullets:
+            line = Line(bullet, player)
+            if line.destination_in_front() and line.distance_from_line() <= player.radius:
+                data[i + 3] = 1
+
     def display_frame(self, screen):
         """ Display everything to the screen for the game. """
         if not screen:
             pass
 
+        import pygame
+        from pygame.color import THECOLORS
+
         screen.fill(pygame.color.THECOLORS["black"])
         font = pygame.font.SysFont("Arial", 16)
-        draw_options = pymunk.pygame_util.DrawOptions(screen)
 
-        removeLines = []
-        if config.debug:
+        lines = []
+        if self.cfg.debug:
             for player in self.players:
                 for other in self.players:
                     if player.index is not other.index:
@@ -230,13 +266,9 @@ class Game(object):
                             angle = 180 * (player.angle % (2 * np.pi)) / np.pi
                             x = 2000 if angle < 90 or angle >= 270 else -2000
                             vision_position = (x, a * x + c)
-                            line = pymunk.Segment(self.space.static_body, player.position, vision_position, 1),
-                            self.space.add(line)
-                            removeLines.append(line)
+                            lines.append((tuple(player.position), vision_position))
             # Draw stuff
-            self.space.debug_draw(draw_options)
-            for line in removeLines:
-                self.space.remove(line)
+            self.physics.draw(screen, lines)
 
             # Info and flip screen
             scores = ''
@@ -246,7 +278,7 @@ class Game(object):
                 screen.blit(font.render("Q" + str(player.index) + "= " + str(q_values), 1, THECOLORS["darkgrey"]),
                             (5, config.SCREEN_HEIGHT - 35 - player.index*15))
 
-            if not config.use_grid:
+            if not self.cfg.use_grid:
                 screen.blit(font.render("High level= " + str(self.get_high_level()), 1, THECOLORS["white"]), (5, 15))
 
             screen.blit(font.render("Scores= " + scores + " Epoch = " + str(self.epoch), 1, THECOLORS["white"]), (5, 0))
@@ -256,9 +288,29 @@ class Game(object):
 
     def update_physics(self, fps):
         self.before_state = self.current_state
-        dt = 1. / fps
-        self.space.step(dt)
+        # Smaller steps keep fast bullets from passing through the walls at a low fps
+        dt = 1. / fps / self.cfg.physics_substeps
+        for _ in range(self.cfg.physics_substeps):
+            self.physics.step(dt)
+        self.cull_bullets()
         self.current_state = self.get_data()
+        self.observe_state()
+
+    def remove_bullet(self, bullet):
+        if bullet in self.bullets:
+            self.physics.remove_bullet(bullet)
+            self.bullets.remove(bullet)
+
+    def cull_bullets(self):
+        """ Removes bullets that left the arena or exceeded their lifetime. """
+        max_age = self.cfg.bullet_lifetime * self.cfg.fps
+        for bullet in list(self.bullets):
+            bullet.age += 1
+            x, y = bullet.position
+            outside = not (config.wall_offset <= x <= config.SCREEN_WIDTH - config.wall_offset and
+                           config.wall_offset <= y <= config.SCREEN_HEIGHT - config.wall_offset)
+            if outside or 0 < max_age < bullet.age:
+                self.remove_bullet(bullet)
 
     def best_player(self):
         best_player = None
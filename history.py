@@ -0,0 +1,35 @@
+import numpy as np
+
+
+class ObservationHistory(object):
+    """ Rolling history of the last `length` observations of a player.
+
+        Every observation is written twice, at position i and i + length of
+        a buffer of 2 * length rows. The last `length` observations are then
+        always a contiguous slice of the buffer, so a push costs two row
+        writes and the window is a view that is never copied. Until `length`
+        observations have been pushed the oldest rows are zeros. """
+
+    def __init__(self, length, size, dtype=np.float32):
+        self.length = length
+        self.size = size
+        self.buffer = np.zeros((2 * length, size), dtype=dtype)
+        self.position = 0
+
+    def clear(self):
+        self.buffer[:] = 0
+        self.position = 0
+
+    def push(self, observation):
+        observation = observation.reshape(-1)
+        self.buffer[self.position] = observation
+        self.buffer[self.position + self.length] = observation
+        self.position = (self.position + 1) % self.length
+
+    def window(self):
+        """ The last `length` observations from old to new, shape (length, size). """
+        return self.buffer[self.position:self.position + self.length]
+
+    def stacked(self):
+        """ The window as a single stacked observation, shape (1, length * size). """
+        return self.window().reshape((1, -1))
@@ -0,0 +1,206 @@
+import sys
+import json
+import random
+import argparse
+import itertools
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+from config import Config
+from checkpoint import Checkpointer
+from processes import run_in_pool
+
+# Player options that determine the architecture of a model
+MODEL_OPTIONS = ("feedforward", "hidden_size", "stack")
+
+# Agents built from snapshots in this process, reused between the matches of a tournament
+_agents = OrderedDict()
+
+
+class SnapshotPool(object):
+    """ Frozen snapshots of agents from earlier epochs.
+
+        A snapshot only holds a copy of the model weights and the options
+        needed to rebuild the model, not the optimizer state or the replay
+        memory. When the pool is full the least recently used snapshot is
+        evicted. """
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.snapshots = OrderedDict()
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def add(self, name, snapshot):
+        self.snapshots[name] = snapshot
+        self.snapshots.move_to_end(name)
+        while len(self.snapshots) > self.capacity:
+            self.snapshots.popitem(last=False)
+
+    def get(self, name):
+        self.snapshots.move_to_end(name)
+        return self.snapshots[name]
+
+    def names(self):
+        return list(self.snapshots)
+
+    def seats(self):
+        """ The seat every snapshot was trained in, by name. """
+        return OrderedDict((name, snap["seat"]) for name, snap in self.snapshots.items())
+
+    def nbytes(self):
+        return sum(w.nbytes for snapshot in self.snapshots.values() for w in snapshot["weights"])
+
+
+def snapshot(weights, player, seat):
+    """ A snapshot of model weights of an agent of the given player options.
+        The observation is indexed by player, so the snapshot keeps the
+        index of the player it was trained as. """
+    return {
+        "seat": seat,
+        "player": {key: player[key] for key in MODEL_OPTIONS if key in player},
+        "weights": [np.array(w, dtype=np.float32) for w in weights],
+    }
+
+
+def load_agent(name, snap, input_size, codec, capacity):
+    """ Returns the agent of a snapshot, built once per process. """
+    from world import create_agent
+
+    if name in _agents:
+        _agents.move_to_end(name)
+        return _agents[name]
+
+    agent = create_agent(dict(snap["player"], random=False), input_size, codec, trainable=False)
+    agent.model.set_weights(snap["weights"])
+    _agents[name] = agent
+    while len(_agents) > capacity:
+        _agents.popitem(last=False)
+    return agent
+
+
+def play_match(arguments):
+    """ Plays a headless greedy match between two snapshots without
+        training, ordered by seat. Returns the names and the final scores. """
+    from game import Game
+    from observation import ObservationCodec
+
+    options, names, snaps, seed, capacity = arguments
+    cfg = Config(**options).replace(players=[dict(snap["player"], random=False) for snap in snaps])
+    random.seed(seed)
+    np.random.seed(seed)
+
+    input_size = Game.get_data_size(cfg)
+    codec = ObservationCodec(cfg.observation_dtype, input_size, cfg.use_grid)
+    agents = [load_agent(name, snap, input_size, codec, capacity) for name, snap in zip(names, snaps)]
+    game = Game(agents, 0, cfg, training=False, epsilon=0)
+    for _ in range(cfg.game_length):
+        game.run(False)
+    return names, [player.score for player in game.players]
+
+
+def schedule(seats, matches):
+    """ Round robin: every pair of snapshots of different seats plays
+        `matches` matches, each snapshot in the seat it was trained in. The
+        pairs are ordered by seat. """
+    pairs = []
+    for first, second in itertools.combinations(seats, 2):
+        if seats[first] == seats[second]:
+            continue
+        pair = (first, second) if seats[first] < seats[second] else (second, first)
+        pairs.extend([pair] * matches)
+    return pairs
+
+
+def elo_ratings(names, results, k=32, initial=1000):
+    """ Elo ratings after the results in the order they were scheduled. A
+        match is won by the player with the highest score. """
+    ratings = {name: float(initial) for name in names}
+    for (first, second), (score_first, score_second) in results:
+        expected = 1 / (1 + 10 ** ((ratings[second] - ratings[first]) / 400))
+        outcome = 1. if score_first > score_second else 0. if score_first < score_second else .5
+        ratings[first] += k * (outcome - expected)
+        ratings[second] -= k * (outcome - expected)
+    return ratings
+
+
+def run_tournament(pool, cfg, matches=None, workers=None):
+    """ Plays the round robin of all snapshots in the pool and returns the
+        ratings and the match results. """
+    if cfg.total_players != 2:
+        raise ValueError("The league plays matches between two snapshots, the models were trained for "
+                         + str(cfg.total_players) + " players")
+
+    matches = cfg.league_matches if matches is None else matches
+    workers = cfg.league_workers if workers is None else workers
+    base = cfg.replace(display_frame=False, envs=1, checkpoint_every=0)
+    seed = 0 if cfg.seed is None else cfg.seed
+    pairs = schedule(pool.seats(), matches)
+    jobs = [(base.to_dict(), pair, [pool.get(name) for name in pair], seed + index, len(pool))
+            for index, pair in enumerate(pairs)]
+
+    # Snapshot names repeat between the worlds of a process, agents of another tournament must not be reused
+    _agents.clear()
+
+    # Worlds that already run in a worker process can't start a pool of their own
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        results = [play_match(job) for job in jobs]
+    else:
+        results = run_in_pool(play_match, jobs, workers)
+
+    return elo_ratings(pool.names(), results), results
+
+
+def write_league(path, ratings, results):
+    records = {name: {"rating": rating, "wins": 0, "losses": 0, "draws": 0} for name, rating in ratings.items()}
+    for names, scores in results:
+        for name, score, other in zip(names, scores, reversed(scores)):
+            key = "wins" if score > other else "losses" if score < other else "draws"
+            records[name][key] += 1
+
+    with open(path, "w") as f:
+        json.dump({
+            "ratings": records,
+            "matches": [{"players": list(names), "scores": list(scores)} for names, scores in results],
+        }, f, indent=4)
+    return records
+
+
+def print_league(records):
+    print("Rank  Rating  Wins  Losses  Draws  Snapshot")
+    ranked = sorted(records.items(), key=lambda item: -item[1]["rating"])
+    for rank, (name, record) in enumerate(ranked):
+        print("%4d  %6.0f  %4d  %6d  %5d  %s" % (
+            rank + 1, record["rating"], record["wins"], record["losses"], record["draws"], name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round robin tournament between the agents of saved checkpoints")
+    parser.add_argument("--profile", help="profile the checkpoints were trained with")
+    parser.add_argument("--matches", type=int, help="matches per pair of snapshots")
+    parser.add_argument("--workers", type=int, help="number of processes")
+    parser.add_argument("--size", type=int, help="maximum number of snapshots, the most recent are kept")
+    args = parser.parse_args(argv)
+
+    cfg = Config.load(args.profile) if args.profile else Config()
+    if cfg.total_players != 2:
+        sys.exit("The league plays matches between two snapshots, the models were trained for "
+                 + str(cfg.total_players) + " players")
+    pool = SnapshotPool(args.size or cfg.league_size)
+    for path in Checkpointer(cfg.checkpoint_dir).list():
+        state = Checkpointer.load(path)
+        for index, agent_state in enumerate(state["agents"]):
+            if not cfg.players[index]["random"]:
+                pool.add("epoch%d_player%d" % (state["epoch"], index),
+                         snapshot(agent_state["weights"], cfg.players[index], index))
+    if len(set(pool.seats().values())) < 2:
+        sys.exit("Snapshots of both players are needed, found " + str(len(pool)) + " in " + cfg.checkpoint_dir)
+
+    print("Playing a round robin between " + str(len(pool)) + " snapshots (" + str(pool.nbytes()) + " bytes)")
+    ratings, results = run_tournament(pool, cfg, args.matches, args.workers)
+    print_league(write_league(cfg.league_file, ratings, results))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
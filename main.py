@@ -1,12 +1,63 @@
 import sys
-import config
-from world import World
+import json
+import argparse
+from config import Config
+from processes import run_in_pool
 
 
-def main():
-    world = World()
+def parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
 
-    for epoch in range(config.epochs):
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Shooter game with self-learning players")
+    parser.add_argument("--profile", help="name of a profile in the profiles directory or path to a JSON/YAML file")
+    parser.add_argument("--resume", action="store_true", help="continue training from the latest checkpoint")
+    parser.add_argument("--headless", action="store_true", help="do not open a window")
+    parser.add_argument("--epochs", type=int, help="number of games to play")
+    parser.add_argument("--envs", type=int, help="number of independent worlds to run")
+    parser.add_argument("--workers", type=int, help="number of processes the worlds are divided over")
+    parser.add_argument("--train-every", type=int, help="train the models every N frames")
+    parser.add_argument("--observation", choices=["high_level", "grid"], help="observation given to the agents")
+    parser.add_argument("--observation-dtype", choices=["float64", "float32", "uint8", "packed"],
+                        help="dtype the observations are stored in")
+    parser.add_argument("--physics", choices=["pymunk", "numpy"], help="physics backend")
+    parser.add_argument("--seed", type=int, help="seed of the random number generators")
+    parser.add_argument("--set", action="append", default=[], metavar="OPTION=VALUE",
+                        help="override any config option, the value is parsed as JSON when possible")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for option in args.set:
+        key, _, value = option.partition("=")
+        overrides[key] = parse_value(value)
+    if args.headless:
+        overrides["display_frame"] = False
+    if args.observation is not None:
+        overrides["use_grid"] = args.observation == "grid"
+    for key in ("epochs", "envs", "workers", "train_every", "observation_dtype", "physics", "seed"):
+        if getattr(args, key) is not None:
+            overrides[key] = getattr(args, key)
+
+    try:
+        cfg = Config.load(args.profile, **overrides) if args.profile else Config(**overrides)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return cfg, args.resume
+
+
+def run_world(cfg, resume=False):
+    from world import World
+
+    world = World(cfg)
+    if resume:
+        world.resume()
+
+    for epoch in range(world.start_epoch, cfg.epochs):
         running = world.run_epoch(epoch)
 
         if not running:
@@ -15,9 +66,59 @@ def main():
     print("Total wins per player:")
     print(world.players_won)
 
-    world.save_results_to_excel()
+    # The trained models are saved first, a failing league must not lose them
     world.save_models()
+    if cfg.league_every > 0:
+        world.run_league()
     world.quit()
+    return world.players_won
+
+
+def run_worlds(cfgs, resume=False):
+    """ Runs several worlds side by side in this process, one epoch of
+        every world at a time. """
+    from world import World
+
+    worlds = [World(cfg) for cfg in cfgs]
+    for world in worlds:
+        if resume:
+            world.resume()
+
+    for epoch in range(min(world.start_epoch for world in worlds), max(cfg.epochs for cfg in cfgs)):
+        for world in worlds:
+            if world.start_epoch <= epoch < world.cfg.epochs:
+                world.run_epoch(epoch)
+
+    results = []
+    for index, world in enumerate(worlds):
+        print("Total wins per player in env " + str(index) + ":")
+        print(world.players_won)
+        world.save_models()
+        if world.cfg.league_every > 0:
+            world.run_league()
+        world.quit()
+        results.append(world.players_won)
+    return results
+
+
+def run_world_process(arguments):
+    options, resume = arguments
+    return run_world(Config(**options), resume)
+
+
+def main(argv=None):
+    cfg, resume = parse_args(argv)
+
+    if cfg.envs <= 1:
+        run_world(cfg, resume)
+        return
+
+    # Several worlds can't share a window
+    cfgs = [cfg.replace(display_frame=False).for_env(index) for index in range(cfg.envs)]
+    if cfg.workers <= 1:
+        run_worlds(cfgs, resume)
+    else:
+        run_in_pool(run_world_process, [(c.to_dict(), resume) for c in cfgs], cfg.workers)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,66 @@
+import gc
+import os
+import sys
+import numpy as np
+
+FIELDS = ["epoch", "rss_bytes", "replay_bytes", "bodies", "shapes", "live_bodies", "live_shapes", "bullets"]
+
+
+def rss_bytes():
+    """ Resident set size of this process. Without /proc the peak resident
+        set size is returned instead. """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def array_bytes(value):
+    """ Total size of the arrays in nested lists and tuples. """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(array_bytes(item) for item in value)
+    return 0
+
+
+def replay_bytes(agents):
+    return sum(array_bytes(agent.memory.memory) for agent in agents)
+
+
+def live_pymunk_objects():
+    """ Number of pymunk bodies and shapes alive in this process, in any
+        space. Bodies of old games that are never freed show up here. """
+    if "pymunk" not in sys.modules:
+        return 0, 0
+    import pymunk
+
+    # Only count objects that are still referenced
+    gc.collect()
+    bodies = shapes = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, pymunk.Body):
+            bodies += 1
+        elif isinstance(obj, pymunk.Shape):
+            shapes += 1
+    return bodies, shapes
+
+
+def memory_report(game, epoch):
+    """ Memory footprint of a game and its agents. """
+    bodies, shapes = game.physics.object_counts()
+    live_bodies, live_shapes = live_pymunk_objects()
+    return {
+        "epoch": epoch,
+        "rss_bytes": rss_bytes(),
+        "replay_bytes": replay_bytes(game.agents),
+        "bodies": bodies,
+        "shapes": shapes,
+        "live_bodies": live_bodies,
+        "live_shapes": live_shapes,
+        "bullets": len(game.bullets),
+    }
@@ -0,0 +1,49 @@
+import os
+import csv
+import json
+
+
+class MetricsWriter(object):
+    """ Appends metric records to a CSV or JSON Lines file while the game is
+        running. Every record is flushed directly, so the progress of a run
+        can be followed live and nothing is lost when a run is interrupted.
+        The format is chosen by the file extension, the CSV columns by
+        `fields`. """
+
+    fields = ["epoch", "frame", "player", "wins", "accuracy", "reward", "loss", "frames_per_sec", "train_steps_per_sec"]
+
+    def __init__(self, path, fields=None):
+        self.path = path
+        if fields is not None:
+            self.fields = fields
+        self.json = path.endswith(".jsonl") or path.endswith(".json")
+        write_header = not os.path.isfile(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="")
+
+        if not self.json:
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fields)
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.json:
+            self.file.write(json.dumps(record) + "\n")
+        else:
+            self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_metrics(path):
+    """ Reads all records of a metrics file back as a list of dicts. """
+    with open(path, newline="") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            return [json.loads(line) for line in f if line.strip()]
+
+        records = []
+        for row in csv.DictReader(f):
+            records.append({key: float(value) if key not in ("epoch", "frame", "player") else int(value)
+                            for key, value in row.items()})
+        return records
@@ -0,0 +1,197 @@
+import numpy as np
+import config
+from player import AbstractPlayer
+
+# Bullet centers beyond these bounds touch a wall (the wall segments have a radius of wall_width)
+BULLET_BOUNDS = (
+    config.wall_offset + config.wall_width + config.BULLET_RADIUS,
+    config.SCREEN_WIDTH - config.wall_offset - config.wall_width - config.BULLET_RADIUS,
+    config.wall_offset + config.wall_width + config.BULLET_RADIUS,
+    config.SCREEN_HEIGHT - config.wall_offset - config.wall_width - config.BULLET_RADIUS,
+)
+
+
+class Vector(np.ndarray):
+    """ A row of a position array that can be used like a pymunk Vec2d. """
+
+    @property
+    def x(self):
+        return self[0]
+
+    @property
+    def y(self):
+        return self[1]
+
+
+def move_bullets(positions, velocities, dt):
+    positions += velocities * dt
+
+
+def bullet_player_overlaps(bullet_positions, player_positions, player_radius):
+    """ Returns a boolean array (..., bullets, players) of the bullets that
+        overlap a player. Leading dimensions are broadcast. """
+    difference = bullet_positions[..., :, np.newaxis, :] - player_positions[..., np.newaxis, :, :]
+    distance = (difference ** 2).sum(axis=-1)
+    return distance < (config.BULLET_RADIUS + player_radius[..., np.newaxis, :]) ** 2
+
+
+def bullet_wall_overlaps(bullet_positions):
+    """ Returns a boolean array (..., bullets) of the bullets that touch or
+        passed a wall. """
+    x = bullet_positions[..., 0]
+    y = bullet_positions[..., 1]
+    xmin, xmax, ymin, ymax = BULLET_BOUNDS
+    return (x < xmin) | (x > xmax) | (y < ymin) | (y > ymax)
+
+
+class KinematicPlayer(AbstractPlayer):
+    """ A player whose position and angle are stored in the arrays of a
+        NumpyPhysics backend. """
+
+    def __init__(self, physics, slot, index, radius=15, player_color=config.colors["red"], speed=3,
+                 random_player=False):
+        self.physics = physics
+        self.slot = slot
+        self.color = player_color
+        AbstractPlayer.__init__(self, index, radius, speed, random_player)
+
+    @property
+    def position(self):
+        return self.physics.player_positions[self.slot].view(Vector)
+
+    @position.setter
+    def position(self, position):
+        self.physics.player_positions[self.slot] = position
+
+    @property
+    def angle(self):
+        return self.physics.player_angles[self.slot]
+
+    @angle.setter
+    def angle(self, angle):
+        self.physics.player_angles[self.slot] = angle
+
+    def create_bullet(self):
+        return self.physics.create_bullet(self)
+
+
+class KinematicBullet(object):
+    """ A bullet whose position is stored in the arrays of a NumpyPhysics
+        backend. """
+
+    def __init__(self, physics, slot, player):
+        self.physics = physics
+        self.slot = slot
+        self.player = player
+        self.radius = config.BULLET_RADIUS
+        self.angle = player.angle
+        self.age = 0
+
+    @property
+    def position(self):
+        return self.physics.bullet_positions[self.slot].view(Vector)
+
+
+class NumpyPhysics(object):
+    """ Simulates the players and bullets of a game with NumPy arrays.
+
+        Players only move when they act and bullets fly in a straight line,
+        so the game only needs overlap tests between bullets and players and
+        between bullets and the walls. All bullets are moved and tested in
+        one vectorized operation per step, after which the hits are applied
+        in the same way as the pymunk collision handlers do. Bullets don't
+        collide with each other, unlike in the pymunk backend. """
+
+    # Player count from which Game applies the actions in one vectorized pass
+    vectorize_players = 10
+
+    def __init__(self, game, capacity=64):
+        self.game = game
+        self.player_positions = np.zeros((0, 2))
+        self.player_angles = np.zeros(0)
+        self.player_radius = np.zeros(0)
+        self.player_objects = []
+
+        # Bullets are stored in slots, removed bullets leave a free slot
+        self.bullet_positions = np.zeros((capacity, 2))
+        self.bullet_velocities = np.zeros((capacity, 2))
+        self.bullet_alive = np.zeros(capacity, dtype=bool)
+        self.bullet_objects = [None] * capacity
+
+    def create_player(self, index, radius, color, random_player):
+        slot = len(self.player_objects)
+        self.player_positions = np.vstack((self.player_positions, np.zeros((1, 2))))
+        self.player_angles = np.append(self.player_angles, 0.)
+        self.player_radius = np.append(self.player_radius, radius)
+        player = KinematicPlayer(self, slot, index, radius, color, random_player=random_player)
+        self.player_objects.append(player)
+        return player
+
+    def player_arrays(self):
+        """ The position and angle arrays of the players, they are updated in place. """
+        return self.player_positions, self.player_angles
+
+    def create_bullet(self, player):
+        free = np.flatnonzero(~self.bullet_alive)
+        if len(free) == 0:
+            self.grow()
+            free = np.flatnonzero(~self.bullet_alive)
+        slot = free[0]
+
+        direction = np.array((np.cos(player.angle), np.sin(player.angle)))
+        # The same start position and velocity as a pymunk bullet with a mass of 1 and an impulse of 1000
+        self.bullet_positions[slot] = player.position + player.radius * direction
+        self.bullet_velocities[slot] = 1000 * direction
+        self.bullet_alive[slot] = True
+        bullet = KinematicBullet(self, slot, player)
+        self.bullet_objects[slot] = bullet
+        return bullet
+
+    def grow(self):
+        capacity = len(self.bullet_alive)
+        self.bullet_positions = np.vstack((self.bullet_positions, np.zeros((capacity, 2))))
+        self.bullet_velocities = np.vstack((self.bullet_velocities, np.zeros((capacity, 2))))
+        self.bullet_alive = np.append(self.bullet_alive, np.zeros(capacity, dtype=bool))
+        self.bullet_objects += [None] * capacity
+
+    def step(self, dt):
+        alive = np.flatnonzero(self.bullet_alive)
+        if len(alive) == 0:
+            return
+
+        # Free slots are moved as well, their positions are overwritten when a bullet is created
+        move_bullets(self.bullet_positions, self.bullet_velocities, dt)
+        positions = self.bullet_positions[alive]
+        hits = bullet_player_overlaps(positions, self.player_positions, self.player_radius)
+        walls = bullet_wall_overlaps(positions)
+
+        for row in np.flatnonzero(hits.any(axis=1) | walls):
+            bullet = self.bullet_objects[alive[row]]
+            if hits[row].any():
+                bullet.player.hit()
+                for slot in np.flatnonzero(hits[row]):
+                    self.player_objects[slot].hurt()
+            self.game.remove_bullet(bullet)
+
+    def remove_bullet(self, bullet):
+        self.bullet_alive[bullet.slot] = False
+        self.bullet_objects[bullet.slot] = None
+
+    def object_counts(self):
+        """ Number of players and bullets, every object is both a body and a shape. """
+        count = len(self.player_objects) + int(self.bullet_alive.sum())
+        return count, count
+
+    def draw(self, screen, lines):
+        import pygame
+
+        xmin, xmax, ymin, ymax = (config.wall_offset, config.SCREEN_WIDTH - config.wall_offset,
+                                  config.wall_offset, config.SCREEN_HEIGHT - config.wall_offset)
+        pygame.draw.rect(screen, (200, 200, 200), (xmin, ymin, xmax - xmin, ymax - ymin), 2 * config.wall_width)
+        for player in self.player_objects:
+            pygame.draw.circle(screen, player.color, [int(v) for v in player.position], int(player.radius), 1)
+        for slot in np.flatnonzero(self.bullet_alive):
+            pygame.draw.circle(screen, (255, 255, 255), [int(v) for v in self.bullet_positions[slot]],
+                               config.BULLET_RADIUS)
+        for start, end in lines:
+            pygame.draw.line(screen, (100, 100, 100), [int(v) for v in start], [int(v) for v in end])
@@ -0,0 +1,152 @@
+import numpy as np
+import config
+
+DTYPES = ("float64", "float32", "uint8", "packed")
+
+
+class ObservationCodec(object):
+    """ Converts observations between the representation that is stored in
+        the replay memories and the float32 input of the models.
+
+        float64 and float32 store the observation as it is. The grid only
+        contains the values 0, 0.5 and 1, so it can also be stored as uint8
+        codes 0, 1 and 2 (uint8), or as two bit planes of these codes packed
+        into bytes (packed). """
+
+    def __init__(self, dtype="float32", size=None, grid=False):
+        if dtype not in DTYPES:
+            raise ValueError("Unknown observation dtype " + str(dtype) + ", use one of " + ", ".join(DTYPES))
+        if dtype in ("uint8", "packed") and not grid:
+            raise ValueError("Observation dtype " + dtype + " can only be used with the grid observation")
+
+        self.dtype = dtype
+        self.size = size
+        self.grid = grid
+        self.build_dtype = np.float64 if dtype == "float64" else np.float32 if dtype == "float32" else np.uint8
+        # Value an observation is multiplied with to get the model input
+        self.scale = .5 if self.build_dtype == np.uint8 else 1.
+
+    def value(self, value):
+        """ Returns the value that is written in an observation of the build dtype. """
+        return int(round(value / self.scale)) if self.build_dtype == np.uint8 else value
+
+    def encode(self, data):
+        if self.dtype != "packed":
+            return data
+
+        bits = np.concatenate((data >> 1, data & 1), axis=1)
+        return np.packbits(bits, axis=1)
+
+    def encode_input(self, data):
+        """ Stores a float32 model input, the inverse of decode. """
+        if self.scale != 1.:
+            data = np.rint(data / self.scale)
+        return self.encode(data.astype(self.build_dtype))
+
+    def decode(self, stored):
+        return self.decode_batch([stored])
+
+    def decode_batch(self, stored):
+        data = np.concatenate(stored)
+        if self.dtype == "packed":
+            bits = np.unpackbits(data, axis=1, count=2 * self.size)
+            data = bits[:, :self.size] * 2 + bits[:, self.size:]
+
+        if data.dtype == np.float32:
+            return data
+        if self.scale != 1.:
+            return data.astype(np.float32) * np.float32(self.scale)
+        return data.astype(np.float32)
+
+
+class IncrementalObservation(object):
+    """ Keeps the observation of a game up to date by only recomputing what
+        changed since the previous frame. Players that moved or rotated are
+        marked with `moved`, bullets are tracked by the grid cell they were
+        last seen in, so spawned, moved and removed bullets are detected.
+
+        The result is the same as a full recomputation with Game.get_grid or
+        Game.get_high_level. """
+
+    def __init__(self, game):
+        self.game = game
+        self.codec = game.codec
+        self.grid = game.cfg.use_grid
+        if self.grid:
+            width = config.normalize_coordinate(config.GAME_WIDTH)
+            height = config.normalize_coordinate(config.GAME_HEIGHT)
+            self.data = np.zeros((config.EXTRA_LAYERS + game.total_players, width, height), dtype=self.codec.build_dtype)
+            # Number of bullets per cell, a cell of the bullet layer is set while it holds any bullet
+            self.bullet_counts = np.zeros((width, height), dtype=np.int32)
+            self.player_cells = {}
+            self.bullet_cells = {}
+        else:
+            self.data = np.zeros(game.total_players * config.DATA_PER_PLAYER, dtype=self.codec.build_dtype)
+            self.had_bullets = False
+
+    def update(self):
+        moved = [player for player in self.game.players if player.moved]
+        if self.grid:
+            self.update_grid(moved)
+        else:
+            self.update_high_level(moved)
+
+        for player in moved:
+            player.moved = False
+
+        # The observation is stored in the replay memories, so it is copied from the array that is updated
+        return self.data.reshape((1, -1)).copy()
+
+    def update_grid(self, moved):
+        one = self.codec.value(1)
+        half = self.codec.value(0.5)
+        for player in moved:
+            index = int(player.index)
+            if index in self.player_cells:
+                x, y, shootX, shootY = self.player_cells[index]
+                self.data[index, x, y] = 0
+                self.data[index, shootX, shootY] = 0
+
+            x, y, shootX, shootY = self.game.player_cells(player)
+            self.data[index, x, y] = one
+            self.data[index, shootX, shootY] = half
+            self.player_cells[index] = (x, y, shootX, shootY)
+
+        if not self.game.players:
+            return
+
+        seen = set()
+        for bullet in self.game.bullets:
+            cell = self.game.bullet_cell(bullet)
+            old_cell = self.bullet_cells.get(bullet)
+            if old_cell != cell:
+                if old_cell is not None:
+                    self.remove_bullet(old_cell)
+                self.add_bullet(cell, one)
+                self.bullet_cells[bullet] = cell
+            seen.add(bullet)
+
+        for bullet in list(self.bullet_cells):
+            if bullet not in seen:
+                self.remove_bullet(self.bullet_cells.pop(bullet))
+
+    def add_bullet(self, cell, one):
+        self.bullet_counts[cell] += 1
+        self.data[self.game.total_players][cell] = one
+
+    def remove_bullet(self, cell):
+        self.bullet_counts[cell] -= 1
+        if self.bullet_counts[cell] == 0:
+            self.data[self.game.total_players][cell] = 0
+
+    def update_high_level(self, moved):
+        has_bullets = len(self.game.bullets) > 0
+        i = 0
+        for player in self.game.players:
+            # The player features depend on the positions of all players
+            if moved:
+                self.game.set_player_features(self.data, i, player)
+            if moved or has_bullets or self.had_bullets:
+                self.game.set_bullet_feature(self.data, i, player)
+            i += config.DATA_PER_PLAYER
+        self.had_bullets = has_bullets
@@ -0,0 +1,119 @@
+import pymunk
+import config
+from player import Player
+
+
+class PymunkPhysics(object):
+    """ Simulates the players and bullets of a game with pymunk. Players are
+        kinematic bodies, bullets are dynamic bodies that are removed by the
+        collision handlers when they hit a wall or a player. """
+
+    # Bodies are read and written one at a time, so a vectorized pass over the actions never pays off
+    vectorize_players = None
+
+    def __init__(self, game):
+        self.game = game
+        self.space = pymunk.Space()
+        if game.cfg.spatial_hash:
+            # Cells of a bullet diameter, most shapes in the space are bullets
+            self.space.use_spatial_hash(2 * config.BULLET_RADIUS, game.cfg.spatial_hash_count)
+
+        # Create walls
+        self.create_walls()
+
+        # Create bullet collision handler
+        self.init_collision_handlers()
+
+    def create_player(self, index, radius, color, random_player):
+        return Player(self.space, index, radius, color, random_player=random_player)
+
+    def create_walls(self):
+        # walls - the left-top-right walls
+        top_left = (config.wall_offset, config.wall_offset)
+        top_right = (config.SCREEN_WIDTH - config.wall_offset, config.wall_offset)
+        bottom_left = (config.wall_offset, config.SCREEN_HEIGHT - config.wall_offset)
+        bottom_right = (config.SCREEN_WIDTH - config.wall_offset, config.SCREEN_HEIGHT - config.wall_offset)
+        static = [
+            pymunk.Segment(self.space.static_body, top_left, top_right, config.wall_width),
+            pymunk.Segment(self.space.static_body, top_right, bottom_right, config.wall_width),
+            pymunk.Segment(self.space.static_body, bottom_right, bottom_left, config.wall_width),
+            pymunk.Segment(self.space.static_body, top_left, bottom_left, config.wall_width),
+        ]
+
+        for s in static:
+            s.friction = 1.
+            s.group = 1
+            s.collision_type = config.collision_types["wall"]
+
+        self.space.add(static)
+
+    def init_collision_handlers(self):
+        game = self.game
+
+        def remove_bullet(arbiter, space, data):
+            bullet_shape = arbiter.shapes[0]
+            game.remove_bullet(bullet_shape.body)
+            return True
+
+        h = self.space.add_collision_handler(config.collision_types["bullet"], config.collision_types["wall"])
+        h.pre_solve = remove_bullet
+
+        def process_bullet_hit(arbiter, space, data):
+            bullet_shape = arbiter.shapes[0]
+            player_shape = arbiter.shapes[1]
+
+            for bullet in game.bullets:
+                if bullet.shape == bullet_shape:
+                    bullet.player.hit()
+
+            for player in game.players:
+                if player.shape == player_shape:
+                    player.hurt()
+
+            return remove_bullet(arbiter, space, data)
+
+        g = self.space.add_collision_handler(config.collision_types["bullet"], config.collision_types["player"])
+        g.pre_solve = process_bullet_hit
+
+        def process_players_hit(arbiter, space, data):
+            player1_shape = arbiter.shapes[0]
+            player2_shape = arbiter.shapes[1]
+
+            for player in game.players:
+                if player.shape == player1_shape or player.shape == player2_shape:
+                    player.touch_player()
+
+            return True
+
+        k = self.space.add_collision_handler(config.collision_types["player"], config.collision_types["player"])
+        k.pre_solve = process_players_hit
+
+    def step(self, dt):
+        self.space.step(dt)
+
+    def remove_bullet(self, bullet):
+        self.space.remove(bullet.shape, bullet)
+
+    def object_counts(self):
+        """ Number of bodies and shapes in the space. """
+        return len(self.space.bodies), len(self.space.shapes)
+
+    def draw(self, screen, lines):
+        """ Draws the space and the given lines of sight. """
+        import pymunk.pygame_util
+
+        draw_options = pymunk.pygame_util.DrawOptions(screen)
+        segments = [pymunk.Segment(self.space.static_body, start, end, 1) for start, end in lines]
+        self.space.add(segments)
+        self.space.debug_draw(draw_options)
+        self.space.remove(segments)
+
+
+def create_physics(game):
+    """ Returns the physics backend of the game configuration. """
+    if game.cfg.physics == "numpy":
+        from numpy_physics import NumpyPhysics
+        return NumpyPhysics(game)
+    if game.cfg.physics == "pymunk":
+        return PymunkPhysics(game)
+    raise ValueError("Unknown physics backend " + str(game.cfg.physics) + ", use pymunk or numpy")
@@ -1,24 +1,60 @@
 import random
 import numpy as np
 import pymunk
-from pygame.color import THECOLORS
 import config
 from bullet import Bullet
 
 
-class Player(pymunk.Body):
+# Direction of movement and rotation of every action
+MOVE_SIGNS = np.zeros(len(config.actions))
+MOVE_SIGNS[config.actions['forward']] = 1
+MOVE_SIGNS[config.actions['backward']] = -1
+ROTATE_SIGNS = np.zeros(len(config.actions))
+ROTATE_SIGNS[config.actions['rotate_left']] = 1
+ROTATE_SIGNS[config.actions['rotate_right']] = -1
 
-    def __init__(self, space, index, radius=15, player_color="red", speed=3):
-        super().__init__()
+
+def apply_actions(positions, angles, cooldowns, actions, speed, bounds):
+    """ Applies the actions of players in the same way as Player.update_state,
+        for arrays with any number of leading dimensions. Positions, angles
+        and cooldowns are updated in place, `bounds` holds the minimum and
+        maximum coordinates (..., 2) of the players. Returns the players
+        that shoot a bullet. """
+    cooldowns -= 1
+
+    step = MOVE_SIGNS.take(actions) * speed
+    moved = np.empty_like(positions)
+    np.multiply(np.cos(angles), step, out=moved[..., 0])
+    np.multiply(np.sin(angles), step, out=moved[..., 1])
+    moved += positions
+    np.minimum(moved, bounds[1], out=moved)
+    np.maximum(moved, bounds[0], out=moved)
+    np.copyto(positions, moved, where=(step != 0)[..., np.newaxis])
+
+    angles += ROTATE_SIGNS.take(actions) * (speed * np.pi / 180)
+
+    shoot = (actions == config.actions['shoot']) & (cooldowns <= 0)
+    np.copyto(cooldowns, 10, where=shoot)
+    return shoot
+
+
+class AbstractPlayer(object):
+    """ The game logic of a player: score, actions and movement. Subclasses
+        store the position and angle in a physics backend and create the
+        bullets. """
+
+    def __init__(self, index, radius=15, speed=3, random_player=False):
         self.score = 0
         self.old_score = 0
         self.shot_bullets = 0
         self.hit_bullets = 0
         self.shoot_cooldown = 0
         self.last_action = None
+        # Set when the position or angle changed, used by the incremental observation
+        self.moved = True
         self.radius = radius
         self.index = index
-        self.random = config.players[self.index]['random']
+        self.random = random_player
         self.offset = {
             "xmin": config.wall_offset + config.wall_width + radius,
             "xmax": config.SCREEN_WIDTH - config.wall_offset - config.wall_width - radius,
@@ -26,19 +62,14 @@ class Player(pymunk.Body):
             "ymax": config.SCREEN_HEIGHT - config.wall_offset - config.wall_width - radius
         }
         self.speed = speed
-        self.body_type = pymunk.Body.KINEMATIC
         self.position = (
             self.offset["xmin"] + random.randint(0, self.offset["xmax"] - self.offset["xmin"]),
             self.offset["ymin"] + random.randint(0, self.offset["ymax"] - self.offset["ymin"])
         )
         self.angle = random.randint(0, 360)
-        self.shape = pymunk.Circle(self, radius, (0, 0))
-        self.shape.color = THECOLORS[player_color]
-        self.shape.sensor = True
-        self.shape.elasticity = 1.0
-        self.shape.collision_type = config.collision_types["player"]
 
-        space.add(self, self.shape)
+    def create_bullet(self):
+        raise NotImplementedError("Class %s doesn't implement create_bullet()" % self.__class__.__name__)
 
     def get_reward(self):
         return self.score - self.old_score
@@ -60,9 +91,21 @@ class Player(pymunk.Body):
         return
 
     def act(self, action):
+        self.begin_action(action)
+        return self.update_state(action)
+
+    def begin_action(self, action):
         self.old_score = self.score
         self.last_action = action
-        return self.update_state(action)
+
+    def finish_action(self, action, cooldown, moved, shoots):
+        """ Applies the result of apply_actions for this player. Returns the
+            new bullet or False, like act. """
+        self.begin_action(action)
+        self.shoot_cooldown = cooldown
+        if moved:
+            self.moved = True
+        return self.fire() if shoots else False
 
     def update_state(self, action):
         self.shoot_cooldown -= 1
@@ -81,26 +124,53 @@ class Player(pymunk.Body):
         return False
 
     def forward(self):
+        self.moved = True
         self.position = (
             max(self.offset["xmin"], min(self.offset["xmax"], self.position.x + np.cos(self.angle) * self.speed)),
             max(self.offset["ymin"], min(self.offset["ymax"], self.position.y + np.sin(self.angle) * self.speed))
         )
 
     def backward(self):
+        self.moved = True
         self.position = (
             max(self.offset["xmin"], min(self.offset["xmax"], self.position.x - np.cos(self.angle) * self.speed)),
             max(self.offset["ymin"], min(self.offset["ymax"], self.position.y - np.sin(self.angle) * self.speed))
         )
 
     def rotate_left(self):
+        self.moved = True
         self.angle += self.speed * np.pi / 180
 
     def rotate_right(self):
+        self.moved = True
         self.angle -= self.speed * np.pi / 180
 
     def shoot(self):
         if self.shoot_cooldown <= 0:
-            self.shot_bullets += 1
             self.shoot_cooldown = 10
-            return Bullet(self.space, self)
+            return self.fire()
         return False
+
+    def fire(self):
+        self.shot_bullets += 1
+        return self.create_bullet()
+
+
+class Player(AbstractPlayer, pymunk.Body):
+    """ A player that is a kinematic body in a pymunk space. """
+
+    def __init__(self, space, index, radius=15, player_color=config.colors["red"], speed=3,
+                 random_player=False):
+        pymunk.Body.__init__(self)
+        self.body_type = pymunk.Body.KINEMATIC
+        AbstractPlayer.__init__(self, index, radius, speed, random_player)
+        self.shape = pymunk.Circle(self, radius, (0, 0))
+        self.shape.color = player_color
+        self.shape.sensor = True
+        self.shape.elasticity = 1.0
+        self.shape.collision_type = config.collision_types["player"]
+
+        space.add(self, self.shape)
+
+    def create_bullet(self):
+        return Bullet(self.space, self)
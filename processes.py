@@ -0,0 +1,15 @@
+import multiprocessing
+
+
+def run_in_pool(function, jobs, workers, chunksize=None):
+    """ Maps the function over the jobs in a pool of at most `workers`
+        processes and returns the results in the order of the jobs.
+
+        The workers are fresh interpreters, the Keras backends are not fork
+        safe. The function and the jobs must therefore be picklable. """
+    pool = multiprocessing.get_context("spawn").Pool(max(1, min(workers, len(jobs))))
+    try:
+        return pool.map(function, jobs, chunksize=chunksize)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from config import Config
+from game import Game
+from metrics import read_metrics
+from memory_report import FIELDS
+from observation import ObservationCodec
+from world import World
+
+# Absolute growth that is always allowed, on top of the relative tolerance
+SLACK = {"rss_bytes": 8 * 1024 * 1024}
+
+
+class RandomWorld(World):
+    """ A world with random agents, so the game can be soaked without Keras. """
+
+    def init_models(self):
+        import agentRandom
+
+        input_size = Game.get_data_size(self.cfg)
+        codec = ObservationCodec(self.cfg.observation_dtype, input_size, self.cfg.use_grid)
+        for player in self.cfg.players[:self.cfg.total_players]:
+            self.agents.append(agentRandom.Agent(input_size, max_memory=player.get("max_memory", 100), codec=codec))
+
+
+def check_growth(reports, warmup, tolerance):
+    """ Compares the average of every field in the first and second half of
+        the epochs after the warmup. Returns the fields that grew more than
+        the tolerance. """
+    reports = reports[int(len(reports) * warmup):]
+    half = len(reports) // 2
+    grown = []
+    print("%-12s  %14s  %14s  %8s" % ("field", "first half", "second half", "growth"))
+    for field in FIELDS[1:]:
+        early = np.mean([float(report[field]) for report in reports[:half]])
+        late = np.mean([float(report[field]) for report in reports[half:]])
+        growth = (late - early) / early if early > 0 else 0.
+        failed = late > early * (1 + tolerance) + SLACK.get(field, 2)
+        print("%-12s  %14.1f  %14.1f  %7.1f%%%s" % (field, early, late, growth * 100, "  GROWING" if failed else ""))
+        if failed:
+            grown.append(field)
+    return grown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many short epochs and fail when the memory footprint grows")
+    parser.add_argument("--profile", help="profile the soak run is based on")
+    parser.add_argument("--epochs", type=int, default=300, help="number of epochs")
+    parser.add_argument("--game-seconds", type=int, default=2, help="length of every epoch in seconds")
+    parser.add_argument("--physics", choices=["pymunk", "numpy"], help="physics backend")
+    parser.add_argument("--random-agents", action="store_true", help="use random agents instead of the models")
+    parser.add_argument("--warmup", type=float, default=.2, help="fraction of the epochs that is not checked")
+    parser.add_argument("--tolerance", type=float, default=.1, help="allowed relative growth")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="soak_")
+    cfg = Config.load(args.profile) if args.profile else Config()
+    cfg = cfg.replace(
+        display_frame=False,
+        envs=1,
+        seed=0 if cfg.seed is None else cfg.seed,
+        epochs=args.epochs,
+        game_seconds=args.game_seconds,
+        checkpoint_dir=os.path.join(directory, "checkpoints"),
+        metrics_file=os.path.join(directory, "metrics.csv"),
+        memory_file=os.path.join(directory, "memory.csv"),
+        model_prefix=os.path.join(directory, "model_player_"),
+        league_every=0,
+        **({"physics": args.physics} if args.physics else {})
+    )
+
+    try:
+        world = RandomWorld(cfg) if args.random_agents else World(cfg)
+        for epoch in range(cfg.epochs):
+            world.run_epoch(epoch)
+        world.quit()
+        reports = read_metrics(cfg.memory_file)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    grown = check_growth(reports, args.warmup, args.tolerance)
+    if grown:
+        print("Unbounded growth of " + ", ".join(grown) + " over " + str(len(reports)) + " epochs")
+        return 1
+    print("No growth over " + str(len(reports)) + " epochs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import random
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+from config import Config
+from main import parse_value
+from metrics import read_metrics
+from processes import run_in_pool
+
+PLAYER_OPTIONS = ("hidden_size", "learning_rate", "discount", "max_memory")
+
+
+def load_space(path):
+    """ Loads the search space from a JSON or YAML file. Every option maps to
+        a list of values, or for random search also to a range like
+        {"min": 1e-4, "max": 1e-2, "log": true}. """
+    with open(path) as f:
+        if path.endswith(".yaml") or path.endswith(".yml"):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def parse_space(params):
+    space = {}
+    for param in params:
+        key, _, values = param.partition("=")
+        space[key] = [parse_value(value) for value in values.split(",")]
+    return space
+
+
+def sample(values, rng):
+    if isinstance(values, dict):
+        if values.get("log", False):
+            value = float(np.exp(rng.uniform(np.log(values["min"]), np.log(values["max"]))))
+        else:
+            value = rng.uniform(values["min"], values["max"])
+        return int(round(value)) if values.get("int", False) else value
+    return rng.choice(values)
+
+
+def grid_trials(space):
+    for values in space.values():
+        if isinstance(values, dict):
+            sys.exit("Ranges can only be used in a random search, use a list of values for a grid search.")
+
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*[space[key] for key in keys])]
+
+
+def random_trials(space, trials, seed):
+    rng = random.Random(seed)
+    return [{key: sample(space[key], rng) for key in sorted(space)} for _ in range(trials)]
+
+
+def trial_config(base, params, index, player, directory):
+    """ The config of a trial: headless, seeded and with its own output files.
+        Player options are applied to the tuned player, others to the config. """
+    players = base.to_dict()["players"]
+    player_params = {key: value for key, value in params.items() if key in PLAYER_OPTIONS}
+    players[player] = dict(players[player], **player_params)
+    options = {key: value for key, value in params.items() if key not in PLAYER_OPTIONS}
+
+    name = os.path.join(directory, "trial_" + str(index))
+    return base.replace(
+        players=players,
+        display_frame=False,
+        envs=1,
+        seed=(0 if base.seed is None else base.seed) + index,
+        checkpoint_every=0,
+        metrics_file=name + ".csv",
+        model_prefix=name + "_player_",
+        **options
+    )
+
+
+def should_stop(progress, index, epoch, score, min_epochs, min_trials):
+    """ Median stopping rule: a trial is stopped when its win rate is lower
+        than the median win rate of the other trials at the same epoch. """
+    if epoch + 1 < min_epochs:
+        return False
+
+    others = [value for (trial, e), value in progress.items() if e == epoch and trial != index]
+    if len(others) < min_trials:
+        return False
+
+    return score < np.median(others)
+
+
+def run_trial(arguments):
+    index, options, player, progress, min_epochs, min_trials = arguments
+    from world import World
+
+    cfg = Config(**options)
+    if os.path.isfile(cfg.metrics_file):
+        os.remove(cfg.metrics_file)
+    world = World(cfg)
+    stopped = False
+    epochs = 0
+    for epoch in range(cfg.epochs):
+        world.run_epoch(epoch)
+        epochs = epoch + 1
+        score = world.players_won[player] / epochs
+        progress[(index, epoch)] = score
+
+        if epochs < cfg.epochs and should_stop(progress, index, epoch, score, min_epochs, min_trials):
+            print("Trial " + str(index) + " stopped early after epoch " + str(epoch))
+            stopped = True
+            break
+    world.quit()
+
+    records = [r for r in read_metrics(cfg.metrics_file) if r["player"] == player]
+    accuracy = {}
+    for r in records:
+        accuracy[r["epoch"]] = r["accuracy"]
+
+    return {
+        "trial": index,
+        "epochs": epochs,
+        "stopped": stopped,
+        "wins": float(world.players_won[player]),
+        "win_rate": float(world.players_won[player]) / max(1, epochs),
+        "accuracy": float(np.mean(list(accuracy.values()))) if accuracy else 0.,
+        "accuracy_history": [accuracy[epoch] for epoch in sorted(accuracy)],
+    }
+
+
+def print_summary(results):
+    print("Rank  Trial  Epochs  Win rate  Accuracy  Params")
+    for rank, result in enumerate(results):
+        print("%4d  %5d  %6d  %8.2f  %8.2f  %s%s" % (
+            rank + 1, result["trial"], result["epochs"], result["win_rate"], result["accuracy"],
+            json.dumps(result["params"]), " (stopped)" if result["stopped"] else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep over parallel headless trials")
+    parser.add_argument("--profile", help="profile the trials are based on")
+    parser.add_argument("--space", help="JSON/YAML file with the search space")
+    parser.add_argument("--param", action="append", default=[], metavar="OPTION=V1,V2,...",
+                        help="values of an option, e.g. learning_rate=0.001,0.01")
+    parser.add_argument("--mode", choices=["grid", "random"], default="grid", help="grid or random search")
+    parser.add_argument("--trials", type=int, default=10, help="number of trials of a random search")
+    parser.add_argument("--epochs", type=int, help="epochs per trial")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="number of processes")
+    parser.add_argument("--player", type=int, default=0, help="index of the player that is tuned and ranked")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the trials and the random search")
+    parser.add_argument("--min-epochs", type=int, default=3, help="epochs before a trial can be stopped early")
+    parser.add_argument("--min-trials", type=int, default=3,
+                        help="reports of other trials needed before a trial can be stopped early")
+    parser.add_argument("--output", default="sweep", help="directory for the trial results")
+    args = parser.parse_args(argv)
+
+    space = load_space(args.space) if args.space else {}
+    space.update(parse_space(args.param))
+    if not space:
+        parser.error("No search space given, use --space or --param")
+
+    base = Config.load(args.profile) if args.profile else Config()
+    base = base.replace(seed=args.seed, **({"epochs": args.epochs} if args.epochs else {}))
+    if args.player >= base.total_players:
+        parser.error("Player " + str(args.player) + " does not exist")
+
+    trials = grid_trials(space) if args.mode == "grid" else random_trials(space, args.trials, args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    print("Running " + str(len(trials)) + " trials on " + str(args.workers) + " workers")
+
+    # The trials share their progress through a manager, so they can stop early
+    manager = multiprocessing.get_context("spawn").Manager()
+    progress = manager.dict()
+    jobs = [(index, trial_config(base, params, index, args.player, args.output).to_dict(), args.player, progress,
+             args.min_epochs, args.min_trials) for index, params in enumerate(trials)]
+
+    try:
+        results = run_in_pool(run_trial, jobs, args.workers, chunksize=1)
+    finally:
+        manager.shutdown()
+
+    for result in results:
+        result["params"] = trials[result["trial"]]
+    results.sort(key=lambda r: (r["stopped"], -r["win_rate"], -r["accuracy"]))
+
+    with open(os.path.join(args.output, "summary.json"), "w") as f:
+        json.dump(results, f, indent=4)
+    print_summary(results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
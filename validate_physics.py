@@ -0,0 +1,88 @@
+import sys
+import argparse
+import numpy as np
+from agentRandom import random_game
+from config import Config
+from batched_game import BatchedGame
+
+
+def play(cfg, seed, frames):
+    """ Plays a seeded game with random agents and returns the scores, the
+        shot and hit bullets and the number of bullets after every frame. """
+    game = random_game(cfg, seed)
+
+    history = []
+    for _ in range(frames):
+        game.update_models()
+        game.update_physics(cfg.fps)
+        history.append((
+            tuple(player.score for player in game.players),
+            tuple(player.shot_bullets for player in game.players),
+            tuple(player.hit_bullets for player in game.players),
+            len(game.bullets),
+        ))
+    return history
+
+
+def compare_batched(cfg, seed, frames):
+    """ Replays the actions of a seeded game on the numpy backend in a
+        BatchedGame of one match. Returns the first frame where the rewards or
+        observations differ, or None. """
+    game = random_game(cfg, seed)
+    batched = BatchedGame(1, cfg)
+    batched.positions[0] = [tuple(player.position) for player in game.players]
+    batched.angles[0] = [player.angle for player in game.players]
+
+    for frame in range(frames):
+        game.update_models()
+        game.update_physics(cfg.fps)
+        rewards, observations = batched.step([[player.last_action for player in game.players]])
+        if (list(rewards[0]) != [player.get_reward() for player in game.players] or
+                not np.array_equal(observations, game.current_state)):
+            return frame
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the numpy physics backend with the pymunk backend")
+    parser.add_argument("--episodes", type=int, default=20, help="number of seeded episodes")
+    parser.add_argument("--frames", type=int, default=500, help="frames per episode")
+    parser.add_argument("--fps", type=int, default=25, help="frames per second")
+    parser.add_argument("--substeps", type=int, default=1, help="physics substeps per frame")
+    parser.add_argument("--batched", action="store_true", help="compare the batched game with the numpy backend")
+    args = parser.parse_args(argv)
+
+    base = Config(display_frame=False, fps=args.fps, physics_substeps=args.substeps)
+    equal = 0
+    if args.batched:
+        for seed in range(args.episodes):
+            frame = compare_batched(base.replace(physics="numpy"), seed, args.frames)
+            if frame is None:
+                equal += 1
+            else:
+                print("Episode %d: diverged at frame %d" % (seed, frame))
+        print("%d of %d episodes have the same rewards and observations in every frame" % (equal, args.episodes))
+        return 0 if equal == args.episodes else 1
+
+    for seed in range(args.episodes):
+        pymunk_history = play(base.replace(physics="pymunk"), seed, args.frames)
+        numpy_history = play(base.replace(physics="numpy"), seed, args.frames)
+
+        # Bullets can bounce off each other in pymunk, so only the number of bullets is allowed to differ
+        diverged = [frame for frame, (a, b) in enumerate(zip(pymunk_history, numpy_history)) if a[:3] != b[:3]]
+        bullets = sum(a[3] != b[3] for a, b in zip(pymunk_history, numpy_history))
+        scores = pymunk_history[-1][0], numpy_history[-1][0]
+        if diverged:
+            print("Episode %d: diverged at frame %d, scores pymunk %s numpy %s" % (
+                seed, diverged[0], scores[0], scores[1]))
+        else:
+            equal += 1
+            print("Episode %d: equal, scores %s, %d frames with a different number of bullets" % (
+                seed, scores[0], bullets))
+
+    print("%d of %d episodes have the same scores and hits in every frame" % (equal, args.episodes))
+    return 0 if equal == args.episodes else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
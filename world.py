@@ -1,82 +1,204 @@
 import numpy as np
+import random
 import sys
-import pygame
-from pandas import DataFrame
+import time
 import config
 from game import Game
-import agentFF
-import agentLSTM
+from checkpoint import Checkpointer
+from metrics import MetricsWriter
+from memory_report import FIELDS as MEMORY_FIELDS, memory_report
+from league import SnapshotPool, snapshot, run_tournament, write_league, print_league
+from observation import ObservationCodec
 import os.path
 
 
+def create_agent(player, input_size, codec, trainable=True):
+    """ Creates the agent of a player of the config. Only the backends of
+        the configured agents are imported. """
+    options = {key: player[key] for key in ("learning_rate", "discount", "max_memory") if key in player}
+    options["codec"] = codec
+    options["trainable"] = trainable
+    if player["feedforward"] and "stack" in player:
+        options["stack"] = player["stack"]
+
+    if player["feedforward"]:
+        import agentFF
+        return agentFF.Agent(input_size, hidden_size=player["hidden_size"], **options)
+    import agentLSTM
+    return agentLSTM.Agent(input_size, hidden_size=player["hidden_size"], **options)
+
+
 class World(object):
-    def __init__(self):
-        pygame.init()
+    def __init__(self, cfg):
+        self.cfg = cfg
         self.size = [config.SCREEN_WIDTH, config.SCREEN_HEIGHT]
-        self.screen = pygame.display.set_mode(self.size) if config.display_frame else False
-
-        if len(config.players) < config.total_players:
+        self.screen = False
+        if cfg.display_frame:
+            # pygame is only needed when the game is drawn
+            import pygame
+            pygame.init()
+            self.screen = pygame.display.set_mode(self.size)
+
+        if len(cfg.players) < cfg.total_players:
             sys.exit(
-                "Not enough player information was provided, " + str(config.total_players) + " players are needed."
+                "Not enough player information was provided, " + str(cfg.total_players) + " players are needed."
             )
 
+        # Snapshots are rebuilt with the input size of the trained models, so league matches need the same players
+        if cfg.league_every > 0 and cfg.total_players != 2:
+            sys.exit("The league plays matches between two snapshots, it needs total_players=2")
+
+        # Without a seed every world still gets a random stream of its own
+        random.seed(cfg.seed)
+        np.random.seed(cfg.seed)
+
         self.agents = []
-        self.players_won = np.zeros(config.total_players)
-        self.player_won_history = np.zeros((config.total_players, config.epochs))
-        self.player_accuracy_history = np.zeros((config.total_players, config.epochs))
+        self.players_won = np.zeros(cfg.total_players)
+        self.metrics = MetricsWriter(cfg.metrics_file)
+        self.memory_writer = MetricsWriter(cfg.memory_file, MEMORY_FIELDS) if cfg.memory_file else None
+        self.checkpointer = Checkpointer(cfg.checkpoint_dir, cfg.checkpoint_keep)
+        self.league = SnapshotPool(cfg.league_size)
+        self.start_epoch = 0
 
         self.init_models()
+        # The random states of this world while another world of the process runs its epochs
+        self.random_states = random.getstate(), np.random.get_state()
 
     def init_models(self):
-        input_size = Game.get_data_size()
-        for index, player in enumerate(config.players):
-            name = "model_player_" + str(index) + ".h5"
-
-            if player["feedforward"]:
-                agent = agentFF.Agent(input_size, hidden_size=player["hidden_size"])
-            else:
-                agent = agentLSTM.Agent(input_size, hidden_size=player["hidden_size"])
-
+        input_size = Game.get_data_size(self.cfg)
+        codec = ObservationCodec(self.cfg.observation_dtype, input_size, self.cfg.use_grid)
+        for index, player in enumerate(self.cfg.players[:self.cfg.total_players]):
+            name = self.cfg.model_prefix + str(index) + ".h5"
+            agent = create_agent(player, input_size, codec)
             if os.path.isfile(name):
                 print("Model is loaded for agent" + str(index))
                 agent.model.load_weights(name)
             self.agents.append(agent)
 
     def run_epoch(self, epoch):
+        """ Plays an epoch with the random states of this world, so worlds
+            that run side by side in one process don't share a stream. """
+        self.swap_random_states()
+        try:
+            running = self.play_epoch(epoch)
+        finally:
+            self.swap_random_states()
+
+        if running and self.cfg.checkpoint_every > 0 and (epoch + 1) % self.cfg.checkpoint_every == 0:
+            self.checkpointer.save(self.get_state(epoch), epoch)
+        return running
+
+    def swap_random_states(self):
+        states = random.getstate(), np.random.get_state()
+        random.setstate(self.random_states[0])
+        np.random.set_state(self.random_states[1])
+        self.random_states = states
+
+    def play_epoch(self, epoch):
         print("Running epoch " + str(epoch) + "...")
-        game = Game(self.agents, epoch)
+        game = Game(self.agents, epoch, self.cfg)
+        start = time.time()
 
-        for x in range(config.game_length):
+        for x in range(self.cfg.game_length):
             if not game.process_events():
                 return False
 
             game.run(self.screen)
 
+            if self.cfg.metrics_every_frames > 0 and (x + 1) % self.cfg.metrics_every_frames == 0:
+                self.write_metrics(game, epoch, x + 1, time.time() - start)
+
         best_player = game.best_player()
         if best_player is not None:
             self.players_won[best_player] += 1
             print("Player " + str(best_player) + " won epoch " + str(epoch))
-        for player in game.players:
-            self.player_won_history[player.index][epoch] = self.players_won[player.index]
-            self.player_accuracy_history[player.index][epoch] = player.get_accuracy()
+        self.write_metrics(game, epoch, self.cfg.game_length, time.time() - start)
+
+        if self.memory_writer is not None:
+            self.memory_writer.write(memory_report(game, epoch))
+
+        if self.cfg.league_every > 0 and (epoch + 1) % self.cfg.league_every == 0:
+            self.add_snapshots(epoch)
 
         return True
 
-    def save_results_to_excel(self):
-        # Save results to excel file.
-        df = DataFrame(data=np.concatenate((self.player_won_history, self.player_accuracy_history)))
-        df = df.T
-        i = 1
-        excel_name = 'game_results'
-        while os.path.isfile(excel_name + str(i) + '.xlsx'):
-            i += 1
-        df.to_excel(excel_name + str(i) + '.xlsx', index=False)
+    def get_state(self, epoch):
+        return {
+            "epoch": epoch,
+            "agents": [agent.get_state() for agent in self.agents],
+            "random": self.random_states[0],
+            "numpy_random": self.random_states[1],
+            "players_won": self.players_won.copy(),
+            "league": list(self.league.snapshots.items()),
+        }
+
+    def set_state(self, state):
+        for agent, agent_state in zip(self.agents, state["agents"]):
+            agent.set_state(agent_state)
+        self.random_states = state["random"], state["numpy_random"]
+        self.players_won = state["players_won"]
+        for name, snap in state.get("league", []):
+            self.league.add(name, snap)
+        self.start_epoch = state["epoch"] + 1
+
+    def resume(self):
+        """ Continue from the latest checkpoint, returns False if there is none. """
+        path = self.checkpointer.latest()
+        if path is None:
+            print("No checkpoint found in " + self.checkpointer.directory)
+            return False
+
+        print("Resuming from " + path)
+        self.set_state(Checkpointer.load(path))
+        return True
+
+    def add_snapshots(self, epoch):
+        for index, agent in enumerate(self.agents):
+            player = self.cfg.players[index]
+            if not player["random"]:
+                self.league.add("epoch%d_player%d" % (epoch, index), snapshot(agent.model.get_weights(), player, index))
+
+    def run_league(self):
+        """ Plays a round robin between the snapshots of the league and
+            writes the ratings to the league file. """
+        players = len(set(self.league.seats().values()))
+        if players < 2:
+            print("Not enough snapshots for a league, found " + str(len(self.league)) + " of " + str(players) + " players")
+            return None
+
+        print("Playing a round robin between " + str(len(self.league)) + " snapshots...")
+        ratings, results = run_tournament(self.league, self.cfg)
+        records = write_league(self.cfg.league_file, ratings, results)
+        print_league(records)
+        return records
+
+    def write_metrics(self, game, epoch, frame, elapsed):
+        frames_per_sec = frame / elapsed if elapsed > 0 else 0
+        train_steps_per_sec = game.train_steps / game.train_time if game.train_time > 0 else 0
+        for player in game.players:
+            self.metrics.write({
+                "epoch": epoch,
+                "frame": frame,
+                "player": player.index,
+                "wins": int(self.players_won[player.index]),
+                "accuracy": player.get_accuracy(),
+                "reward": float(game.rewards[player.index]),
+                "loss": float(game.losses[player.index] / max(1, game.train_steps)),
+                "frames_per_sec": frames_per_sec,
+                "train_steps_per_sec": train_steps_per_sec,
+            })
 
     def save_models(self):
         for index, agent in enumerate(self.agents):
-            name = "model_player_" + str(index)
+            name = self.cfg.model_prefix + str(index)
             agent.model.save_weights(name + ".h5", overwrite=True)
 
     def quit(self):
-        # Close window and exit
-        pygame.quit()
+        # Wait for pending checkpoints, close window and exit
+        self.checkpointer.wait()
+        self.metrics.close()
+        if self.memory_writer is not None:
+            self.memory_writer.close()
+        if self.cfg.display_frame:
+            import pygame
+            pygame.quit()